@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") != "0"
+# Cosine similarity above which two questions count as the same question
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.93"))
+ANSWER_CACHE_AGRONOMY_TTL = float(os.getenv("ANSWER_CACHE_AGRONOMY_TTL", str(7 * 86400)))
+ANSWER_CACHE_MAX_PER_BUCKET = int(os.getenv("ANSWER_CACHE_MAX_PER_BUCKET", "256"))
+
+# Prices and forecasts change daily, so those answers only live until midnight
+SAME_DAY_INTENTS = {"market", "weather"}
+
+
+def _end_of_day():
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return tomorrow.timestamp()
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by (state, district, language, date bucket, intent); within a
+    bucket a new question hits if its embedding is close enough to a cached one.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_per_bucket=ANSWER_CACHE_MAX_PER_BUCKET):
+        self.threshold = threshold
+        self.max_per_bucket = max_per_bucket
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket_key(location, lang, intent):
+        date_bucket = date.today().isoformat() if intent in SAME_DAY_INTENTS else "any"
+        return (location.get("state"), location.get("district"), lang, date_bucket, intent)
+
+    def bypass_reason(self, location):
+        if not ANSWER_CACHE_ENABLED:
+            return "disabled"
+        # Without a region the answer may not transfer between farmers
+        if not location.get("state"):
+            return "no_location"
+        return None
+
+    def _bypass(self, reason):
+        with self._lock:
+            self.bypassed[reason] = self.bypassed.get(reason, 0) + 1
+
+    def lookup(self, vector, location, lang, intent):
+        reason = self.bypass_reason(location)
+        if reason:
+            self._bypass(reason)
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        now = time.time()
+        with self._lock:
+            entries = [e for e in self._buckets.get(self.bucket_key(location, lang, intent), []) if e["expires"] > now]
+            best = None
+            if entries:
+                scores = np.stack([e["vector"] for e in entries]) @ query
+                idx = int(np.argmax(scores))
+                if scores[idx] >= self.threshold:
+                    best = entries[idx]
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best["answer"]
+
+    def store(self, vector, location, lang, intent, answer):
+        if self.bypass_reason(location):
+            return
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        now = time.time()
+        expires = _end_of_day() if intent in SAME_DAY_INTENTS else now + ANSWER_CACHE_AGRONOMY_TTL
+        key = self.bucket_key(location, lang, intent)
+        with self._lock:
+            entries = [e for e in self._buckets.get(key, []) if e["expires"] > now]
+            entries.append({"vector": query, "answer": answer, "expires": expires})
+            self._buckets[key] = entries[-self.max_per_bucket:]
+            # Drop buckets from previous days so the cache doesn't grow forever
+            for stale in [k for k, v in self._buckets.items() if not v or v[-1]["expires"] <= now]:
+                del self._buckets[stale]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": sum(len(v) for v in self._buckets.values()),
+                "buckets": len(self._buckets),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": dict(self.bypassed),
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
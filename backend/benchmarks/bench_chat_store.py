@@ -0,0 +1,74 @@
+"""
+Message write throughput on a scratch chat database: the old pattern
+(connection per call, rollback journal, commit per message) against the
+WAL read pool + group-commit writer in chat_store.py.
+
+    python benchmarks/bench_chat_store.py --threads 32 --messages 200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+import chat_store  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT, role TEXT, content TEXT, chat_id TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+INSERT = "INSERT INTO messages (user_id, role, content, chat_id) VALUES (?, ?, ?, ?)"
+
+
+def run_threads(threads, messages, write):
+    def farmer(n):
+        for i in range(messages):
+            write((f"user{n}", "user", f"what is the price of onion today? {i}", f"chat{n}"))
+
+    workers = [threading.Thread(target=farmer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return threads * messages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--messages", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "old.db")
+        sqlite3.connect(old_path).execute(SCHEMA)
+
+        def old_write(params):
+            conn = sqlite3.connect(old_path, timeout=30)
+            conn.execute(INSERT, params)
+            conn.commit()
+            conn.close()
+
+        print(f"connection per write  {run_threads(args.threads, args.messages, old_write):8.0f} msgs/s")
+
+        new_path = os.path.join(tmp, "new.db")
+        conn = chat_store.connect(new_path)
+        conn.execute(SCHEMA)
+        conn.close()
+        writer = chat_store.GroupCommitWriter(new_path)
+        qps = run_threads(args.threads, args.messages, lambda params: writer.write(INSERT, params))
+        writer.close()
+        print(f"group-commit writer   {qps:8.0f} msgs/s  {writer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Cold-start time of the API and the ingestion entry points, each measured
+in a fresh interpreter:
+
+- import time of main, ingest_steps and ingest;
+- for a real uvicorn process, the seconds until /healthz answers and
+  until /readyz reports ready, plus the warmup step breakdown.
+
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --no-server --repeat 5
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def import_seconds(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_seconds(timeout):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    healthy = ready = None
+    body = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=2.0) as client:
+            while time.perf_counter() - start < timeout and ready is None:
+                try:
+                    if healthy is None and client.get("/healthz").status_code == 200:
+                        healthy = time.perf_counter() - start
+                    res = client.get("/readyz")
+                    if res.status_code == 200:
+                        ready = time.perf_counter() - start
+                        body = res.json()
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return healthy, ready, body
+
+
+def fmt(seconds):
+    return f"{seconds:6.2f}s" if seconds is not None else "  n/a "
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-server", action="store_true", help="only measure import times")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    for module in ("main", "ingest_steps", "ingest"):
+        try:
+            times = [import_seconds(module) for _ in range(args.repeat)]
+            print(f"import {module:<14} best {min(times):6.2f}s  worst {max(times):6.2f}s")
+        except RuntimeError as e:
+            print(f"import {module:<14} failed: {e}")
+
+    if not args.no_server:
+        healthy, ready, body = server_seconds(args.timeout)
+        print(f"uvicorn /healthz          {fmt(healthy)}")
+        print(f"uvicorn /readyz           {fmt(ready)}")
+        if body:
+            print(f"warmup steps: {body.get('warmup')}")
+
+
+if __name__ == "__main__":
+    main()
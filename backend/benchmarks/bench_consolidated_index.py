@@ -0,0 +1,94 @@
+"""
+Separate per-source Chroma stores vs. the consolidated store, on the
+dense (ANN) part of retrieval:
+
+- latency: one query per store, back to back, vs. one shared query with
+  per-source top-k (embeddings.dense_ids_by_source);
+- recall@k per source: how many of each separate store's top-k ids the
+  consolidated query also returns.
+
+Build the consolidated store first with `python consolidate_index.py`.
+
+    python benchmarks/bench_consolidated_index.py --k 3 --samples 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from embeddings import dense_ids_by_source  # noqa: E402
+from resources import BM25_COLLECTIONS, get_consolidated_store, get_embedding_model, get_store  # noqa: E402
+
+QUESTIONS = [
+    "What is the price of onion in Nashik mandi today?",
+    "Which fertilizer should I use for sugarcane in black soil?",
+    "Best paddy variety for drought in Odisha",
+    "How do I control aphids on mustard?",
+    "PMKSY drip irrigation subsidy",
+    "DRR Dhan 42",
+    "cold tolerance of tomato",
+    "wheat yield per hectare in Punjab",
+]
+
+
+def sample_queries(samples):
+    # Real questions plus the opening words of random stored chunks
+    rng = random.Random(7)
+    queries = list(QUESTIONS)
+    for name in BM25_COLLECTIONS:
+        collection = get_store(name)._collection
+        count = collection.count()
+        for _ in range(min(count, samples // len(BM25_COLLECTIONS))):
+            doc = collection.get(limit=1, offset=rng.randrange(count), include=["documents"])["documents"][0]
+            queries.append(" ".join(doc.split()[:12]))
+    return queries
+
+
+def percentile(values, p):
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    queries = sample_queries(args.samples)
+    vectors = get_embedding_model().embed_documents(queries)
+    separate = {name: get_store(name)._collection for name in BM25_COLLECTIONS}
+    consolidated = get_consolidated_store()._collection
+
+    separate_ms, consolidated_ms = [], []
+    recall = {name: [] for name in BM25_COLLECTIONS}
+    for vector in vectors:
+        start = time.perf_counter()
+        expected = {
+            name: collection.query(query_embeddings=[vector], n_results=args.k, include=[])["ids"][0]
+            for name, collection in separate.items()
+        }
+        separate_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        got = dense_ids_by_source(consolidated, vector, list(BM25_COLLECTIONS), args.k)
+        consolidated_ms.append((time.perf_counter() - start) * 1000)
+
+        for name, ids in expected.items():
+            if ids:
+                recall[name].append(len(set(ids) & set(got[name])) / len(ids))
+
+    print(f"{len(queries)} queries, k={args.k}, sources={', '.join(BM25_COLLECTIONS)}")
+    for label, timings in (("separate stores", separate_ms), ("consolidated", consolidated_ms)):
+        print(f"{label:<16} p50 {statistics.median(timings):7.2f} ms  p95 {percentile(timings, 0.95):7.2f} ms")
+    for name, values in recall.items():
+        if values:
+            print(f"recall@{args.k} {name:<15} {statistics.mean(values):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Query embedding throughput and memory per backend. Each run loads one
+backend in a fresh process so peak RSS is that backend's alone.
+
+    python benchmarks/bench_embeddings.py --backend torch
+    python benchmarks/bench_embeddings.py --backend onnx --threads 4
+    python benchmarks/bench_embeddings.py --backend onnx --concurrency 32
+
+Reports load time, single-query latency, batch throughput, and
+concurrent queries/sec with and without the dynamic BatchingEmbedder.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from embedding_backends import BatchingEmbedder, create_embedding_model  # noqa: E402
+
+QUERIES = [
+    f"{q} {i}" for i in range(64) for q in (
+        "price of onion in Nashik mandi",
+        "fertilizer for sugarcane in black soil",
+        "should I irrigate wheat this week",
+        "paddy variety for drought in Odisha",
+    )
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def concurrent_qps(embed, queries, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(embed, queries))
+        return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = create_embedding_model(args.backend, threads=args.threads)
+    model.embed_query("warmup")
+    print(f"backend {args.backend}, threads {args.threads or 'default'}")
+    print(f"load + warmup            {time.perf_counter() - start:8.2f} s")
+
+    start = time.perf_counter()
+    for q in QUERIES[:32]:
+        model.embed_query(q)
+    print(f"single query latency     {(time.perf_counter() - start) / 32 * 1000:8.2f} ms")
+
+    start = time.perf_counter()
+    model.embed_documents(QUERIES)
+    print(f"batch of {len(QUERIES)}             {len(QUERIES) / (time.perf_counter() - start):8.1f} queries/s")
+
+    print(f"concurrent x{args.concurrency:<3} direct  {concurrent_qps(model.embed_query, QUERIES, args.concurrency):8.1f} queries/s")
+    batcher = BatchingEmbedder(model)
+    qps = concurrent_qps(batcher.embed_query, QUERIES, args.concurrency)
+    print(f"concurrent x{args.concurrency:<3} batched {qps:8.1f} queries/s  (avg batch {batcher.stats()['avg_batch']})")
+    print(f"peak RSS                 {peak_rss_mb():8.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
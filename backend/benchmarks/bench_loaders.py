@@ -0,0 +1,82 @@
+"""
+Peak memory of the streaming loaders (loaders.py) against reading the
+whole file first, as the old ingest functions did. Peak is measured with
+tracemalloc, so it counts Python/pandas allocations only.
+
+    python benchmarks/bench_loaders.py
+    python benchmarks/bench_loaders.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from ingestion import serialize_rows, group_rows  # noqa: E402
+from loaders import iter_chunks  # noqa: E402
+
+
+def whole_file(path, rows_per_doc):
+    if path.endswith(".xlsx"):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+    for text in group_rows(serialize_rows(df), rows_per_doc):
+        yield text, {}
+
+
+def measure(label, fn, path, rows_per_doc):
+    tracemalloc.start()
+    start = time.perf_counter()
+    docs = 0
+    for _ in fn(path, rows_per_doc):
+        docs += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<40} {docs:>8} docs  {elapsed:>7.2f}s  peak {peak / 1e6:>8.1f} MB")
+
+
+def synthetic_csv(rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Crop": rng.choice(["Rice", "Wheat", "Maize", "Cotton"], rows),
+        "State": rng.choice(["Punjab", "Bihar", "Kerala", "Gujarat"], rows),
+        "Year": rng.integers(1997, 2021, rows),
+        "Area": rng.random(rows) * 1000,
+        "Production": rng.random(rows) * 5000,
+    })
+    f = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+    f.close()
+    df.to_csv(f.name, index=False)
+    return f.name
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000, help="rows in the synthetic CSV")
+    args = parser.parse_args()
+
+    xlsx = os.path.join(BACKEND_DIR, "data_pdf", "crop_yield_dataset_1.xlsx")
+    if os.path.exists(xlsx):
+        measure("xlsx whole file (pd.read_excel)", whole_file, xlsx, 5)
+        measure("xlsx streaming (openpyxl read-only)", iter_chunks, xlsx, 5)
+
+    path = synthetic_csv(args.rows)
+    try:
+        label = f"csv {args.rows:,} rows"
+        measure(f"{label} whole file", whole_file, path, 500)
+        measure(f"{label} streaming", iter_chunks, path, 500)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
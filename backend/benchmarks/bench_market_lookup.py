@@ -0,0 +1,114 @@
+"""
+Old LOWER(Commodity) LIKE '%x%' lookup vs. the indexed equality lookup used by
+market.get_market_price_table, on a synthetic market_prices table.
+
+    python benchmarks/bench_market_lookup.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from commodities import commodity_dictionary, resolve_commodity  # noqa: E402
+
+COLUMNS = '"Market Name", "District Name", "Min Price(Rs./Quintal)", "Max Price(Rs./Quintal)", "Modal Price(Rs./Quintal)", "Price Date"'
+
+OLD_QUERY = f"""
+    SELECT {COLUMNS} FROM market_prices
+    WHERE LOWER(Commodity) LIKE ? AND "District Name" LIKE ?
+    ORDER BY "Market Name"
+"""
+
+
+def new_query(n):
+    return f"""
+        SELECT {COLUMNS} FROM market_prices
+        WHERE Commodity IN ({", ".join("?" * n)}) AND "District Name" = ?
+        ORDER BY "Market Name"
+    """
+
+
+def build_table(path, rows, districts=700, markets_per_district=4, days=45):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE market_prices (
+            "District Name" TEXT, "Market Name" TEXT, "Commodity" TEXT, "Variety" TEXT,
+            "Min Price(Rs./Quintal)" TEXT, "Max Price(Rs./Quintal)" TEXT,
+            "Modal Price(Rs./Quintal)" TEXT, "Price Date" TEXT
+        )
+    """)
+    names = commodity_dictionary.names
+    rng = random.Random(42)
+
+    def generate():
+        for _ in range(rows):
+            d = rng.randrange(districts)
+            price = rng.randint(800, 9000)
+            yield (
+                f"District {d}", f"Market {d}-{rng.randrange(markets_per_district)}",
+                rng.choice(names), "Other",
+                str(price - 200), str(price + 200), str(price),
+                f"{rng.randrange(1, days + 1):02d} Sep 2025",
+            )
+
+    conn.executemany("INSERT INTO market_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?)", generate())
+    conn.execute('CREATE INDEX idx_commodity ON market_prices("Commodity")')
+    conn.execute('CREATE INDEX idx_district ON market_prices("District Name")')
+    conn.execute('CREATE INDEX idx_commodity_district ON market_prices("Commodity", "District Name")')
+    conn.commit()
+    conn.close()
+
+
+def time_queries(conn, cases, run):
+    timings = []
+    for case in cases:
+        start = time.perf_counter()
+        run(conn, case)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_market.db")
+    start = time.perf_counter()
+    build_table(path, args.rows)
+    print(f"Built {args.rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(7)
+    words = ["wheat", "onion", "potato", "tomato", "cotton", "paddy", "maize", "soyabean", "mustard", "garlic"]
+    cases = [(rng.choice(words), f"District {rng.randrange(700)}") for _ in range(args.queries)]
+
+    conn = sqlite3.connect(path)
+
+    def run_old(conn, case):
+        word, district = case
+        conn.execute(OLD_QUERY, (f"%{word}%", district)).fetchall()
+
+    def run_new(conn, case):
+        word, district = case
+        names = resolve_commodity(word)
+        conn.execute(new_query(len(names)), (*names, district)).fetchall()
+
+    for label, run in (("LOWER(...) LIKE '%x%'", run_old), ("indexed IN + equality", run_new)):
+        timings = time_queries(conn, cases, run)
+        print(
+            f"{label:<24} mean {statistics.mean(timings):8.2f} ms   "
+            f"p50 {statistics.median(timings):8.2f} ms   "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.2f} ms"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Row serialization throughput: the old df.iterrows() loop vs. the column-wise
+ingestion.serialize_rows, plus how many add_texts calls each batching scheme
+makes. Embedding time is left out on purpose; this measures Python overhead.
+
+    python benchmarks/bench_serialize.py
+    python benchmarks/bench_serialize.py --csv data_csv/crop_yield.csv --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from ingestion import serialize_rows, group_rows, INGEST_BATCH_SIZE  # noqa: E402
+
+
+def serialize_iterrows(df, chunk_size):
+    """The loop ingest_all_csvs used before."""
+    docs = []
+    for start_idx in range(0, len(df), chunk_size):
+        chunk_rows = df.iloc[start_idx: start_idx + chunk_size]
+        chunk_texts = [" | ".join([f"{col}: {row[col]}" for col in chunk_rows.columns]) for _, row in chunk_rows.iterrows()]
+        docs.append("\n".join(chunk_texts))
+    return docs
+
+
+def serialize_vectorized(df, chunk_size):
+    return group_rows(serialize_rows(df), chunk_size)
+
+
+def synthetic_market_rows(n):
+    rng = np.random.default_rng(0)
+    price = rng.integers(800, 9000, n)
+    return pd.DataFrame({
+        "District Name": [f"District {i}" for i in rng.integers(0, 700, n)],
+        "Market Name": [f"Market {i}" for i in rng.integers(0, 2800, n)],
+        "Commodity": rng.choice(["Wheat", "Onion", "Potato", "Tomato", "Cotton"], n),
+        "Variety": "Other",
+        "Min Price(Rs./Quintal)": price - 200,
+        "Max Price(Rs./Quintal)": price + 200,
+        "Modal Price(Rs./Quintal)": price,
+        "Price Date": "01 Sep 2025",
+    })
+
+
+def bench(label, df, chunk_size, repeat):
+    results = {}
+    for name, fn in (("iterrows", serialize_iterrows), ("vectorized", serialize_vectorized)):
+        best = min(_timed(fn, df, chunk_size) for _ in range(repeat))
+        results[name] = best
+        print(f"{label:<28} {name:<11} {len(df) / best:>12,.0f} rows/sec  ({best:.2f}s)")
+    sample = df.head(chunk_size * 2)
+    same = serialize_iterrows(sample, chunk_size) == serialize_vectorized(sample, chunk_size)
+    print(f"{label:<28} identical output on first {len(sample)} rows: {same}")
+    print(f"{label:<28} speedup     {results['iterrows'] / results['vectorized']:>12.1f}x")
+    docs = (len(df) + chunk_size - 1) // chunk_size
+    print(f"{label:<28} add_texts calls: per chunk {docs}, batched {(docs + INGEST_BATCH_SIZE - 1) // INGEST_BATCH_SIZE}")
+
+
+def _timed(fn, df, chunk_size):
+    start = time.perf_counter()
+    fn(df, chunk_size)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=os.path.join(BACKEND_DIR, "data_csv", "crop_yield.csv"))
+    parser.add_argument("--market-rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    bench(os.path.basename(args.csv), pd.read_csv(args.csv), 500, args.repeat)
+    bench(f"market_prices ({args.market_rows:,})", synthetic_market_rows(args.market_rows), 500, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Parity check for the int8 ONNX embedding backend against the PyTorch model
+the stores were built with. Embeds a sample of real questions and corpus
+chunks with both and fails (exit 1) if any pair's cosine similarity is
+below the threshold.
+
+    python export_onnx_model.py
+    python benchmarks/check_embedding_parity.py --threshold 0.99
+"""
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from embedding_backends import create_embedding_model  # noqa: E402
+from loaders import iter_chunks  # noqa: E402
+
+QUESTIONS = [
+    "What is the price of onion in Nashik mandi today?",
+    "Which fertilizer should I use for sugarcane in black soil?",
+    "Will it rain in Pune this week, should I irrigate my wheat?",
+    "Best paddy variety for drought in Odisha",
+    "How do I control aphids on mustard?",
+    "PMKSY drip irrigation subsidy",
+    "DRR Dhan 42",
+    "my tomato crop may get damaged by cold, what should I do",
+]
+
+
+def sample_texts(limit):
+    texts = list(QUESTIONS)
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "data_states", "*.txt")))[:5]:
+        for text, _ in iter_chunks(path):
+            texts.append(text)
+            break
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "data_csv", "*.csv"))):
+        for text, _ in iter_chunks(path, 5):
+            texts.append(text)
+            break
+    return texts[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=0.99)
+    parser.add_argument("--limit", type=int, default=64)
+    args = parser.parse_args()
+
+    texts = sample_texts(args.limit)
+    reference = np.array(create_embedding_model("torch").embed_documents(texts))
+    candidate = np.array(create_embedding_model("onnx").embed_documents(texts))
+
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate /= np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = (reference * candidate).sum(axis=1)
+
+    print(f"{len(texts)} texts: min cosine {cosines.min():.4f}, mean {cosines.mean():.4f}")
+    worst = int(cosines.argmin())
+    print(f"worst: {texts[worst][:80]!r}")
+    if cosines.min() < args.threshold:
+        print(f"FAIL: below {args.threshold}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+In-process BM25 index per Chroma collection, kept in step with the
+collection during ingestion and saved next to it. Dense MiniLM search
+misses exact tokens like variety names ("DRR Dhan 42") and scheme
+acronyms ("PMKSY"); BM25 catches them, and reciprocal rank fusion
+merges both rankings.
+"""
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BM25_DIR = os.getenv("BM25_DIR", os.path.join(BASE_DIR, "bm25_index"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal rank fusion constant; 60 is the usual choice
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Queries with at most this many keywords skip the vector search
+BM25_ONLY_MAX_TERMS = int(os.getenv("BM25_ONLY_MAX_TERMS", "3"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "at", "by", "with", "from", "is", "are",
+    "was", "were", "be", "it", "its", "this", "that", "what", "which", "how", "when", "where", "who", "why",
+    "do", "does", "did", "i", "my", "me", "we", "our", "you", "your", "can", "should", "will", "about",
+    "tell", "please", "give", "best", "good", "nan",
+}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index of term -> {doc id: term frequency}. Documents are
+    added and removed by their Chroma ids, so the index follows the
+    incremental ingestion manifest.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_len = {}
+        self.doc_terms = {}
+        self.total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, ids, texts):
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                if doc_id in self.doc_len:
+                    self._remove(doc_id)
+                counts = Counter(tokenize(text))
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+                length = sum(counts.values())
+                self.doc_len[doc_id] = length
+                self.doc_terms[doc_id] = tuple(counts)
+                self.total_len += length
+
+    def remove(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self.doc_len:
+                    self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        for term in self.doc_terms.pop(doc_id):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        self.total_len -= self.doc_len.pop(doc_id)
+
+    def search(self, query, k=5, require_all=False):
+        """[(doc id, score)] best first. `require_all` keeps only docs containing every query term."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        n = len(self.doc_len)
+        if not terms or not n:
+            return []
+        avg_len = self.total_len / n
+        scores = {}
+        matched = Counter()
+        for term in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                if require_all:
+                    return []
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                matched[doc_id] += 1
+        if require_all:
+            scores = {d: s for d, s in scores.items() if matched[d] == len(terms)}
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            data = {"postings": self.postings, "doc_len": self.doc_len, "doc_terms": self.doc_terms}
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Readers never see a half-written index
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        index.postings = data["postings"]
+        index.doc_len = data["doc_len"]
+        index.doc_terms = data["doc_terms"]
+        index.total_len = sum(index.doc_len.values())
+        return index
+
+
+def index_path(collection):
+    return os.path.join(BM25_DIR, f"{collection}.pkl")
+
+
+def open_index(store, batch_size=5000):
+    """
+    The collection's saved index, or one built from the documents already
+    in the store (collections ingested before BM25 existed).
+    """
+    collection = store._collection.name
+    path = index_path(collection)
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    index = BM25Index()
+    total = store._collection.count()
+    for offset in range(0, total, batch_size):
+        data = store._collection.get(limit=batch_size, offset=offset, include=["documents"])
+        index.add(data["ids"], data["documents"])
+    return index
+
+
+def load_index(collection):
+    """Saved index for the API, or None when the collection has none yet."""
+    path = index_path(collection)
+    if not os.path.exists(path):
+        return None
+    try:
+        return BM25Index.load(path)
+    except Exception as e:
+        print(f"Error loading BM25 index {path}: {e}")
+        return None
+
+
+def rrf_fuse(rankings, k=RRF_K):
+    """Reciprocal rank fusion of several ranked id lists; returns ids best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def is_keyword_query(query):
+    """Short queries like "PMKSY subsidy" or "DRR Dhan 42" are served by BM25 alone."""
+    return 0 < len(tokenize(query)) <= BM25_ONLY_MAX_TERMS
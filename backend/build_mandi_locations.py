@@ -0,0 +1,81 @@
+"""
+Geocode every mandi in agri_market.db once and save the coordinates to
+data_geo/mandi_locations.csv for the nearest-market index (mandi_index.py).
+Already geocoded mandis are kept, so rerun it after new mandis appear.
+
+    python build_mandi_locations.py
+"""
+import csv
+import os
+import sqlite3
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from mandi_index import MANDI_LOCATIONS_PATH
+
+load_dotenv()
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agri_market.db")
+OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
+# OpenCage's free tier allows one request per second
+REQUEST_INTERVAL = 1.0
+
+
+def forward_geocode(client, place):
+    params = {"q": place, "key": os.getenv("OPENCAGE_KEY"), "countrycode": "in", "limit": 1, "no_annotations": 1}
+    res = client.get(OPENCAGE_URL, params=params)
+    res.raise_for_status()
+    results = res.json().get("results") or []
+    if not results:
+        return None
+    geometry = results[0]["geometry"]
+    return geometry["lat"], geometry["lng"]
+
+
+def main():
+    conn = sqlite3.connect(DB_PATH)
+    mandis = conn.execute(
+        'SELECT DISTINCT "Market Name", "District Name" FROM market_prices ORDER BY "District Name", "Market Name"'
+    ).fetchall()
+    conn.close()
+
+    done = {}
+    if os.path.exists(MANDI_LOCATIONS_PATH):
+        with open(MANDI_LOCATIONS_PATH, newline="", encoding="utf-8") as f:
+            done = {(r["market"], r["district"]): r for r in csv.DictReader(f)}
+
+    district_points = {}
+    with httpx.Client(timeout=10.0) as client:
+        for market, district in mandis:
+            if (market, district) in done:
+                continue
+            try:
+                point = forward_geocode(client, f"{market}, {district}, India")
+                time.sleep(REQUEST_INTERVAL)
+                # Fall back to the district when the mandi itself isn't known to the geocoder
+                if point is None:
+                    if district not in district_points:
+                        district_points[district] = forward_geocode(client, f"{district}, India")
+                        time.sleep(REQUEST_INTERVAL)
+                    point = district_points[district]
+            except Exception as e:
+                print(f"Error geocoding {market}, {district}: {e}")
+                continue
+            if point is None:
+                print(f"No location found for {market}, {district}")
+                continue
+            done[(market, district)] = {"market": market, "district": district, "lat": point[0], "lon": point[1]}
+            print(f"{market}, {district}: {point[0]:.4f}, {point[1]:.4f}")
+
+    os.makedirs(os.path.dirname(MANDI_LOCATIONS_PATH), exist_ok=True)
+    with open(MANDI_LOCATIONS_PATH, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["market", "district", "lat", "lon"])
+        writer.writeheader()
+        writer.writerows(done.values())
+    print(f"Saved {len(done)} mandi locations to {MANDI_LOCATIONS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
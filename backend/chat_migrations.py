@@ -0,0 +1,102 @@
+"""
+Versioned schema for chat_history.db. Migrations run once each, in order,
+in their own transaction; PRAGMA user_version records the last one applied.
+Append new steps to MIGRATIONS, never edit one that has already shipped.
+
+    python chat_migrations.py      # upgrade and print the schema version
+"""
+from chat_store import connect
+
+
+def _baseline(conn):
+    # The tables as they were before versioning. Idempotent, so databases
+    # created by older builds (missing columns included) upgrade cleanly
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        gmail TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        password_hash TEXT,
+        oauth_provider TEXT,
+        oauth_id TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(users)")]
+    for column, ddl in (
+        ("password_hash", "password_hash TEXT"),
+        ("oauth_provider", "oauth_provider TEXT"),
+        ("oauth_id", "oauth_id TEXT"),
+        ("created_at", "created_at DATETIME DEFAULT CURRENT_TIMESTAMP"),
+    ):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE users ADD COLUMN {ddl}")
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        role TEXT,
+        content TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS chats (
+        id TEXT PRIMARY KEY,
+        user_id TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        title TEXT
+    )
+    """)
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(messages)")]
+    if "chat_id" not in columns:
+        conn.execute("ALTER TABLE messages ADD COLUMN chat_id TEXT")
+
+
+def _history_indexes(conn):
+    # One index per history query, in the order it filters and sorts, so
+    # each page is an index range scan instead of a table scan plus sort
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages(chat_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_user_id ON messages(user_id, id)")
+    # id breaks ties between chats created in the same second
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chats_user_created ON chats(user_id, created_at, id)")
+
+
+MIGRATIONS = [
+    (1, "baseline tables", _baseline),
+    (2, "history indexes", _history_indexes),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=None):
+    """Bring the database up to the latest version; safe to run from several processes."""
+    conn = connect(path)
+    try:
+        for version, name, step in MIGRATIONS:
+            # Re-read the version under the write lock so concurrent workers
+            # don't apply the same step twice
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if schema_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            print(f"chat_history.db: applied migration {version} ({name})")
+        conn.execute("PRAGMA optimize")
+        return schema_version(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print(f"chat_history.db schema version {migrate()}")
@@ -0,0 +1,210 @@
+"""
+Storage layer for chat_history.db (messages, chats, users).
+
+- Every connection runs in WAL mode with tuned pragmas, so readers never
+  block the writer and commits don't fsync the whole database.
+- Reads borrow a connection from a small pool instead of opening one per call.
+- All writes go through one writer thread that owns the only write
+  connection. Writes queued while it is busy are committed together in
+  one transaction (group commit), so write latency stays flat when many
+  farmers chat at once. Each write runs in its own savepoint, so one
+  failing statement doesn't undo the others in its group.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import sqlite3
+
+CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", "chat_history.db")
+CHAT_READ_POOL_SIZE = int(os.getenv("CHAT_READ_POOL_SIZE", "4"))
+CHAT_WRITE_BATCH_MAX = int(os.getenv("CHAT_WRITE_BATCH_MAX", "256"))
+# How long the writer waits for more writes to join a group
+CHAT_WRITE_WAIT_MS = float(os.getenv("CHAT_WRITE_WAIT_MS", "2"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # Durable across application crashes; only an OS crash can lose the last commits
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+
+def connect(path=None):
+    # isolation_level=None: no implicit transactions; the writer issues BEGIN/COMMIT itself
+    conn = sqlite3.connect(path or CHAT_DB_PATH, check_same_thread=False, isolation_level=None, timeout=5.0)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ReadPool:
+    def __init__(self, path=None, size=CHAT_READ_POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path)
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class GroupCommitWriter:
+    def __init__(self, path=None, batch_max=CHAT_WRITE_BATCH_MAX, wait_ms=CHAT_WRITE_WAIT_MS):
+        self.path = path
+        self.batch_max = batch_max
+        self.wait = wait_ms / 1000.0
+        self.commits = 0
+        self.writes = 0
+        self.max_group = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params=()):
+        """Queue a write; the future resolves to the statement's lastrowid once it is committed."""
+        future = Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def write(self, sql, params=()):
+        return self.submit(sql, params).result()
+
+    async def awrite(self, sql, params=()):
+        return await asyncio.wrap_future(self.submit(sql, params))
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            group = [item]
+            deadline = time.monotonic() + self.wait
+            while len(group) < self.batch_max:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                group.append(item)
+            self._commit(conn, group)
+        conn.close()
+
+    def _commit(self, conn, group):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, params, _ in group:
+                conn.execute("SAVEPOINT w")
+                try:
+                    results.append(conn.execute(sql, params).lastrowid)
+                    conn.execute("RELEASE w")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO w")
+                    conn.execute("RELEASE w")
+                    results.append(e)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, _, future in group:
+                future.set_exception(e)
+            return
+        self.commits += 1
+        self.writes += len(group)
+        self.max_group = max(self.max_group, len(group))
+        for (_, _, future), result in zip(group, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Commit everything still queued, then stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "commits": self.commits,
+            "writes": self.writes,
+            "avg_group": round(self.writes / self.commits, 2) if self.commits else 0.0,
+            "max_group": self.max_group,
+            "queued": self._queue.qsize(),
+        }
+
+
+_lock = threading.Lock()
+_read_pool = None
+_writer = None
+
+
+def read_pool():
+    global _read_pool
+    with _lock:
+        if _read_pool is None:
+            _read_pool = ReadPool()
+        return _read_pool
+
+
+def writer():
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = GroupCommitWriter()
+        return _writer
+
+
+def fetch_all(sql, params=()):
+    with read_pool().connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def fetch_one(sql, params=()):
+    with read_pool().connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def page_cursor(rows, limit, key="id"):
+    """Cursor for the page after `rows`, or None when this was the last one."""
+    return rows[-1][key] if len(rows) == limit else None
+
+
+def close():
+    global _read_pool, _writer
+    with _lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+        if _read_pool is not None:
+            _read_pool.close()
+            _read_pool = None
+
+
+def stats():
+    return _writer.stats() if _writer is not None else None
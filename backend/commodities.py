@@ -0,0 +1,146 @@
+import csv
+import difflib
+import os
+import re
+from functools import lru_cache
+from urllib.parse import unquote_plus
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMMODITY_CSV = os.getenv(
+    "COMMODITY_CSV",
+    os.path.join(BASE_DIR, "..", "agrimarket", "CommodityAndCommodityHeads.csv"),
+)
+# Similarity (difflib ratio) needed before a misspelt word is accepted as a
+# commodity: onin/onion 0.89, cotten/cotton 0.83, wheet/wheat 0.80
+FUZZY_THRESHOLD = float(os.getenv("COMMODITY_FUZZY_THRESHOLD", "0.8"))
+
+# Local and Hindi names farmers actually type, mapped to Agmarknet commodity names
+ALIASES = {
+    "gehun": "Wheat", "gehu": "Wheat", "gahu": "Wheat", "atta": "Wheat Atta",
+    "dhan": "Paddy(Dhan)(Common)", "paddy": "Paddy(Dhan)(Common)", "basmati": "Paddy(Dhan)(Basmati)",
+    "chawal": "Rice", "makka": "Maize", "makki": "Maize", "corn": "Maize",
+    "jowar": "Jowar(Sorghum)", "bajra": "Bajra(Pearl Millet/Cumbu)", "ragi": "Ragi (Finger Millet)",
+    "chana": "Bengal Gram(Gram)(Whole)", "gram": "Bengal Gram(Gram)(Whole)", "chickpea": "Bengal Gram(Gram)(Whole)",
+    "arhar": "Arhar (Tur/Red Gram)(Whole)", "tur": "Arhar (Tur/Red Gram)(Whole)", "toor": "Arhar (Tur/Red Gram)(Whole)",
+    "urad": "Black Gram (Urd Beans)(Whole)", "moong": "Green Gram (Moong)(Whole)", "masoor": "Lentil (Masur)(Whole)",
+    "mungfali": "Groundnut", "moongphali": "Groundnut", "peanut": "Groundnut",
+    "sarson": "Mustard", "rai": "Mustard", "til": "Sesamum(Sesame,Gingelly,Til)", "sesame": "Sesamum(Sesame,Gingelly,Til)",
+    "soybean": "Soyabean", "soya": "Soyabean", "kapas": "Cotton", "narma": "Cotton",
+    "pyaz": "Onion", "pyaaz": "Onion", "kanda": "Onion", "aloo": "Potato", "batata": "Potato",
+    "tamatar": "Tomato", "lahsun": "Garlic", "lehsun": "Garlic", "adrak": "Ginger(Green)",
+    "mirchi": "Green Chilli", "chilli": ("Green Chilli", "Dry Chillies"), "chili": ("Green Chilli", "Dry Chillies"),
+    "haldi": "Turmeric", "jeera": "Cummin Seed(Jeera)", "cumin": "Cummin Seed(Jeera)",
+    "dhaniya": "Corriander seed", "coriander": "Corriander seed", "gobhi": "Cauliflower", "baingan": "Brinjal",
+    "bhindi": "Bhindi(Ladies Finger)", "okra": "Bhindi(Ladies Finger)", "ganna": "Sugarcane", "kela": "Banana",
+    "aam": "Mango", "santra": "Orange", "anar": "Pomegranate", "nimbu": "Lemon", "gud": "Gur(Jaggery)",
+}
+
+# Parenthesised parts that describe a grade or form rather than a commodity
+GENERIC_PARTS = {"whole", "common", "loose", "local", "raw", "dry", "green", "veg", "w", "single", "double", "split"}
+# Commodity names that are also everyday English words; matching them causes false hits
+AMBIGUOUS = {"same", "ram", "bop", "cane", "wood", "mace", "lint", "javi"}
+STOPWORDS = {
+    "the", "of", "for", "in", "at", "and", "price", "prices", "rate", "rates", "market", "mandi",
+    "what", "is", "today", "sell", "my", "near", "me", "current", "bhav", "district", "state",
+    # Close enough to a commodity to pass the fuzzy match (season/sarson)
+    "season", "water", "weather", "crop", "crops", "week",
+}
+# Words inside many commodity names that don't pick out one commodity on their own
+DESCRIPTIVE_WORDS = {"seed", "seeds", "black", "white", "sweet", "leaves", "flower", "small", "fresh"}
+
+
+def normalize(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def load_commodity_names(path=COMMODITY_CSV):
+    if not os.path.exists(path):
+        print(f"Commodity list not found at {path}")
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        names = [unquote_plus(row["CommodityHead"]).strip() for row in csv.DictReader(f)]
+    return list(dict.fromkeys(n for n in names if n))
+
+
+class CommodityDictionary:
+    """
+    Resolves free text ("price of gehun in ludhiana", "onions") to the exact
+    Commodity values stored in market_prices, so lookups can use equality on
+    the indexed column instead of LIKE '%x%'.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.phrases = {}
+        for name in names:
+            self._add(normalize(name), name)
+            # "Paddy(Dhan)(Common)" is also known as "paddy" and "dhan"
+            for part in re.split(r"[()/,]", name):
+                part = normalize(part)
+                if part and part not in GENERIC_PARTS:
+                    self._add(part, name)
+        known = set(names)
+        for alias, targets in ALIASES.items():
+            for name in [targets] if isinstance(targets, str) else targets:
+                if name in known:
+                    self._add(alias, name)
+        self.max_words = max((len(p.split()) for p in self.phrases), default=1)
+        self.phrase_list = list(self.phrases)
+        self.name_words = {name: set(normalize(name).split()) for name in names}
+
+    def _add(self, phrase, name):
+        if phrase in AMBIGUOUS:
+            return
+        targets = self.phrases.setdefault(phrase, [])
+        if name not in targets:
+            targets.append(name)
+
+    def resolve(self, text):
+        """Exact commodity names mentioned in `text`, best matches first."""
+        words = normalize(text).split()
+        found = []
+        covered = set()
+        # Longest phrases first so "black gram" wins over "gram"
+        for n in range(min(self.max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                if covered & set(range(i, i + n)):
+                    continue
+                phrase = " ".join(words[i:i + n])
+                targets = self.phrases.get(phrase)
+                if targets is None and n == 1 and phrase.endswith("s"):
+                    targets = self.phrases.get(phrase[:-1])
+                if targets:
+                    found.extend(t for t in targets if t not in found)
+                    covered.update(range(i, i + n))
+        if found:
+            return found
+        return self.containing(words) or self.fuzzy(words)
+
+    def _candidates(self, words):
+        return [w for w in words if len(w) >= 4 and w not in STOPWORDS and w not in GENERIC_PARTS]
+
+    def containing(self, words):
+        """Names with one of the words in them ("chilli" -> "Green Chilli"), like the old LIKE lookup."""
+        found = []
+        for word in self._candidates(words):
+            if word in DESCRIPTIVE_WORDS:
+                continue
+            found.extend(n for n in self.names if word in self.name_words[n] and n not in found)
+        return found
+
+    def fuzzy(self, words):
+        best, best_score = None, 0.0
+        for word in self._candidates(words):
+            for phrase in difflib.get_close_matches(word, self.phrase_list, n=1, cutoff=FUZZY_THRESHOLD):
+                score = difflib.SequenceMatcher(None, word, phrase).ratio()
+                if score > best_score:
+                    best, best_score = self.phrases[phrase], score
+        return list(best) if best else []
+
+
+commodity_dictionary = CommodityDictionary(load_commodity_names())
+
+
+@lru_cache(maxsize=4096)
+def resolve_commodity(text):
+    return tuple(commodity_dictionary.resolve(text or ""))
@@ -0,0 +1,60 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Chroma and SQLite calls are blocking, so they run on a bounded pool
+# instead of the event loop. The pool size caps how many of them run at once.
+BLOCKING_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "8")),
+    thread_name_prefix="agrisense-blocking",
+)
+
+# Per-source timeouts in seconds. A source that takes longer is dropped
+# and its default is used, so one slow API can't hold up the answer.
+DEFAULT_SOURCE_TIMEOUT = float(os.getenv("SOURCE_TIMEOUT", "8"))
+SOURCE_TIMEOUTS = {
+    "geocode": float(os.getenv("TIMEOUT_GEOCODE", "5")),
+    "main": float(os.getenv("TIMEOUT_RETRIEVAL", "6")),
+    "seeds": float(os.getenv("TIMEOUT_RETRIEVAL", "6")),
+    "custom": float(os.getenv("TIMEOUT_RETRIEVAL", "6")),
+    "state": float(os.getenv("TIMEOUT_RETRIEVAL", "6")),
+    "retrieval": float(os.getenv("TIMEOUT_RETRIEVAL", "6")),
+    "cold_docs": float(os.getenv("TIMEOUT_RETRIEVAL", "6")),
+    "tables": float(os.getenv("TIMEOUT_TABLES", "2")),
+    "market": float(os.getenv("TIMEOUT_MARKET", "6")),
+    "soil": float(os.getenv("TIMEOUT_WEATHER", "8")),
+    "weather": float(os.getenv("TIMEOUT_WEATHER", "8")),
+    "cold_forecast": float(os.getenv("TIMEOUT_WEATHER", "8")),
+}
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call on the shared pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(BLOCKING_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def with_timeout(name, awaitable, default):
+    """Await one context source, falling back to `default` on timeout or error."""
+    timeout = SOURCE_TIMEOUTS.get(name, DEFAULT_SOURCE_TIMEOUT)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        print(f"Context source '{name}' timed out after {timeout}s, dropping it")
+    except Exception as e:
+        print(f"Context source '{name}' failed: {e}")
+    return default
+
+
+async def gather_sources(sources):
+    """
+    Run independent context sources at the same time.
+    `sources` maps a name to an (awaitable, default) pair; the result maps
+    the same names to their values, so latency is set by the slowest source.
+    """
+    names = list(sources)
+    results = await asyncio.gather(
+        *(with_timeout(name, awaitable, default) for name, (awaitable, default) in sources.items())
+    )
+    return dict(zip(names, results))
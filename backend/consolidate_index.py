@@ -0,0 +1,82 @@
+"""
+Build or refresh the consolidated Chroma store (VECTOR_INDEX=consolidated)
+from the separate per-source stores.
+
+Embeddings are copied, not recomputed. Every document keeps its id (chunk
+ids already include the collection name, so they don't collide) and gets
+a `source` metadata field naming its original collection and a
+`source_file` naming the file (or table:date) it was cut from, looked up
+in the ingest manifest; state names are canonicalized so the `state`
+filter matches the geocoder. Re-running syncs
+the copy: documents are upserted and ids gone from a source are deleted.
+
+    python consolidate_index.py
+    python consolidate_index.py --sources knowledge_base seed_db
+"""
+import argparse
+import time
+
+from manifest import IngestManifest
+from resources import STORE_DIRS, get_consolidated_store, get_store
+from state_index import canonical_state
+
+CONSOLIDATE_BATCH_SIZE = 2000
+
+
+def consolidated_metadata(source, metadata, source_file=None):
+    metadata = dict(metadata or {})
+    # The loaders store no file name in Chroma; the manifest knows each chunk's source
+    metadata["source_file"] = source_file or metadata.get("source_file", "")
+    metadata["source"] = source
+    if metadata.get("state"):
+        metadata["state"] = canonical_state(metadata["state"]) or metadata["state"]
+    return metadata
+
+
+def consolidate_source(target, name, chunk_sources, batch_size=CONSOLIDATE_BATCH_SIZE):
+    source = get_store(name)._collection
+    seen = set()
+    offset = 0
+    while True:
+        batch = source.get(include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        target.upsert(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=[
+                consolidated_metadata(name, m, chunk_sources.get(doc_id))
+                for doc_id, m in zip(batch["ids"], batch["metadatas"])
+            ],
+        )
+        seen.update(batch["ids"])
+        offset += len(batch["ids"])
+    stale = [doc_id for doc_id in target.get(where={"source": name}, include=[])["ids"] if doc_id not in seen]
+    for start in range(0, len(stale), batch_size):
+        target.delete(ids=stale[start:start + batch_size])
+    return len(seen), len(stale)
+
+
+def consolidate(sources=tuple(STORE_DIRS), batch_size=CONSOLIDATE_BATCH_SIZE):
+    store = get_consolidated_store()
+    manifest = IngestManifest()
+    for name in sources:
+        start = time.perf_counter()
+        copied, deleted = consolidate_source(store._collection, name, manifest.chunk_sources(name), batch_size)
+        print(f"{name}: {copied} documents copied, {deleted} stale removed in {time.perf_counter() - start:.1f}s")
+    manifest.close()
+    store.persist()
+    print(f"Consolidated store holds {store._collection.count()} documents")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the separate Chroma stores into the consolidated one")
+    parser.add_argument("--sources", nargs="+", default=list(STORE_DIRS), choices=list(STORE_DIRS))
+    parser.add_argument("--batch-size", type=int, default=CONSOLIDATE_BATCH_SIZE)
+    args = parser.parse_args()
+    consolidate(args.sources, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Embedding backends for all-MiniLM-L6-v2, chosen with EMBEDDING_BACKEND:
+
+    torch  HuggingFaceEmbeddings on PyTorch (default, what the stores were built with)
+    onnx   int8-quantized ONNX Runtime export of the same model; much smaller
+           and faster on CPU. Build it once with export_onnx_model.py.
+
+Both expose embed_documents/embed_query, so Chroma, the query cache and
+the ingestion pipeline don't care which one is in use.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(BASE_DIR, "models", "minilm-onnx-int8"))
+# Intra-op threads for the model; 0 leaves the library default (all cores)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Dynamic batching of concurrent query embeddings
+EMBEDDING_BATCH_MAX = int(os.getenv("EMBEDDING_BATCH_MAX", "32"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+# sentence-transformers truncates this model at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+class OnnxMiniLMEmbeddings:
+    """
+    MiniLM on ONNX Runtime: tokenize, run the encoder, mean-pool over the
+    attention mask and L2-normalize, the same steps sentence-transformers
+    applies for this model.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, threads=EMBEDDING_THREADS, batch_size=64):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+    def _encode(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(list(texts[start:start + self.batch_size])).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
+
+
+def create_embedding_model(backend=EMBEDDING_BACKEND, threads=EMBEDDING_THREADS):
+    if backend == "onnx":
+        return OnnxMiniLMEmbeddings(threads=threads)
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; use torch or onnx")
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+
+class BatchingEmbedder:
+    """
+    Collects embed_query calls from concurrent requests for up to
+    `max_wait_ms` and runs them through the model as one batch. One batched
+    forward pass costs little more than a single query on CPU, so
+    throughput under load goes up without hurting a lone request much.
+    """
+
+    def __init__(self, model, max_batch=EMBEDDING_BATCH_MAX, max_wait_ms=EMBEDDING_BATCH_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.queries = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def embed_query(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Wait a moment for other requests to join, then run what we have
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            try:
+                vectors = self.model.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,162 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from bm25 import is_keyword_query, rrf_fuse
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+
+def normalize_query(text):
+    # all-MiniLM-L6-v2 is uncased, so case and spacing don't change the vector
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query vectors keyed by normalized text.
+    Farmers repeat the same questions a lot, so most lookups skip the model.
+    """
+
+    def __init__(self, embedding_model, max_size=QUERY_CACHE_SIZE):
+        self.embedding_model = embedding_model
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+        vector = self.embedding_model.embed_query(key)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def search_by_vector(store, vector, k, filter=None):
+    """Vector search against a Chroma store without re-embedding the query."""
+    return store.similarity_search_by_vector(vector, k=k, filter=filter)
+
+
+# How each hybrid_search call was served, for /stats
+retrieval_modes = Counter()
+
+
+def documents_map(store, ids):
+    """{id: Document} for the ids found in the store."""
+    from langchain.schema import Document
+
+    if not ids:
+        return {}
+    data = store._collection.get(ids=list(dict.fromkeys(ids)), include=["documents", "metadatas"])
+    return {
+        doc_id: Document(page_content=text or "", metadata=metadata or {})
+        for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+    }
+
+
+def documents_by_id(store, ids):
+    """Fetch documents by id, keeping the order of `ids`."""
+    found = documents_map(store, ids)
+    return [found[doc_id] for doc_id in ids if doc_id in found]
+
+
+def hybrid_search(store, bm25_index, vector, query, k, filter=None):
+    """
+    BM25 and vector rankings fused with reciprocal rank fusion. Short
+    keyword queries whose terms all appear in some document are answered
+    from BM25 alone, without the ANN search.
+    """
+    if bm25_index is None or filter is not None:
+        retrieval_modes["vector"] += 1
+        return search_by_vector(store, vector, k, filter)
+    if is_keyword_query(query):
+        hits = bm25_index.search(query, k, require_all=True)
+        if hits:
+            retrieval_modes["bm25"] += 1
+            return documents_by_id(store, [doc_id for doc_id, _ in hits])
+    retrieval_modes["hybrid"] += 1
+    lexical = [doc_id for doc_id, _ in bm25_index.search(query, k * 2)]
+    dense = store._collection.query(query_embeddings=[vector], n_results=k * 2, include=[])["ids"][0]
+    return documents_by_id(store, rrf_fuse([dense, lexical])[:k])
+
+
+# Candidates fetched per requested source from the consolidated store's
+# shared ANN query, as a multiple of k
+CONSOLIDATED_OVERSAMPLE = int(os.getenv("CONSOLIDATED_OVERSAMPLE", "3"))
+
+
+def source_filter(sources, filter=None):
+    where = {"source": sources[0]} if len(sources) == 1 else {"source": {"$in": list(sources)}}
+    return {"$and": [where, filter]} if filter else where
+
+
+def dense_ids_by_source(collection, vector, sources, per_source, filter=None):
+    """
+    {source: [ids best first]} from one ANN query over the consolidated
+    collection. A source crowded out of the shared candidate list by the
+    others gets its own filtered query.
+    """
+    n = per_source * len(sources) * CONSOLIDATED_OVERSAMPLE
+    result = collection.query(query_embeddings=[vector], n_results=n,
+                              where=source_filter(sources, filter), include=["metadatas"])
+    ranked = {source: [] for source in sources}
+    for doc_id, metadata in zip(result["ids"][0], result["metadatas"][0]):
+        found = ranked.get((metadata or {}).get("source"))
+        if found is not None and len(found) < per_source:
+            found.append(doc_id)
+    # Fewer than n hits means every matching document was returned already
+    if len(result["ids"][0]) == n:
+        for source, found in ranked.items():
+            if len(found) < per_source:
+                ranked[source] = collection.query(query_embeddings=[vector], n_results=per_source,
+                                                  where=source_filter([source], filter), include=[])["ids"][0]
+    return ranked
+
+
+def search_sources(store, bm25_indexes, vector, query, k, sources, filter=None):
+    """
+    Top-k documents per source from the consolidated store: one ANN query
+    for all sources, fused per source with that source's BM25 ranking
+    like hybrid_search, and one fetch for all the winning documents.
+    Returns {source: [Document]}.
+    """
+    dense = dense_ids_by_source(store._collection, vector, sources, k * 2, filter)
+    chosen = {}
+    for source in sources:
+        bm25_index = bm25_indexes.get(source)
+        if bm25_index is None or query is None or filter is not None:
+            chosen[source] = dense[source][:k]
+            continue
+        if is_keyword_query(query):
+            hits = bm25_index.search(query, k, require_all=True)
+            if hits:
+                chosen[source] = [doc_id for doc_id, _ in hits]
+                continue
+        lexical = [doc_id for doc_id, _ in bm25_index.search(query, k * 2)]
+        chosen[source] = rrf_fuse([dense[source], lexical])[:k]
+    retrieval_modes["consolidated"] += 1
+    found = documents_map(store, [doc_id for ids in chosen.values() for doc_id in ids])
+    return {source: [found[doc_id] for doc_id in ids if doc_id in found] for source, ids in chosen.items()}
@@ -0,0 +1,55 @@
+"""
+Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 for the onnx
+embedding backend (EMBEDDING_BACKEND=onnx). Needs torch and transformers,
+which the torch backend already requires; the API itself then only needs
+onnxruntime and tokenizers.
+
+    python export_onnx_model.py
+    python benchmarks/check_embedding_parity.py
+"""
+import os
+import shutil
+import tempfile
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoTokenizer
+
+from embedding_backends import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR
+
+
+def main():
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME).eval()
+    sample = tokenizer(["an example farmer question"], return_tensors="pt")
+
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = os.path.join(tmp, "model_fp32.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "token_type_ids": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=14,
+            )
+        # Dynamic quantization: int8 weights, activations quantized on the fly
+        quantize_dynamic(fp32_path, os.path.join(ONNX_MODEL_DIR, "model.onnx"), weight_type=QuantType.QInt8)
+
+    # The fast tokenizer's tokenizer.json is all OnnxMiniLMEmbeddings needs
+    with tempfile.TemporaryDirectory() as tmp:
+        tokenizer.save_pretrained(tmp)
+        shutil.copy(os.path.join(tmp, "tokenizer.json"), os.path.join(ONNX_MODEL_DIR, "tokenizer.json"))
+    print(f"Saved int8 ONNX model to {ONNX_MODEL_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import csv
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join(BASE_DIR, "geocode_cache.db"))
+# 0.01° is roughly a 1 km cell, small enough that a cell never spans two districts in practice
+GEOCODE_CELL_DEG = float(os.getenv("GEOCODE_CELL_DEG", "0.01"))
+GEOCODE_TTL = float(os.getenv("GEOCODE_TTL_DAYS", "30")) * 86400
+GEOCODE_CACHE_MAX = int(os.getenv("GEOCODE_CACHE_MAX", "100000"))
+# last_used only drives LRU eviction, so a hit rewrites it at most this often
+# instead of putting a write and an fsync on every cache hit
+GEOCODE_TOUCH_INTERVAL = 86400
+# off: never guess locally | fallback: only when OpenCage fails |
+# prefer: skip OpenCage whenever the gazetteer resolves a district
+GEOCODE_OFFLINE = os.getenv("GEOCODE_OFFLINE", "fallback")
+
+STATE_CENTROIDS_PATH = os.getenv("STATE_CENTROIDS_PATH", os.path.join(BASE_DIR, "data_geo", "india_states.csv"))
+# Optional district,state,lat,lon file; without it the offline lookup only resolves states
+DISTRICT_CENTROIDS_PATH = os.getenv("DISTRICT_CENTROIDS_PATH", os.path.join(BASE_DIR, "data_geo", "india_districts.csv"))
+# Points further than this from every centroid are treated as outside India
+OFFLINE_MAX_KM = float(os.getenv("GEOCODE_OFFLINE_MAX_KM", "500"))
+
+
+def cell_key(lat, lon, cell_deg=GEOCODE_CELL_DEG):
+    return f"{round(lat / cell_deg)}:{round(lon / cell_deg)}"
+
+
+class GeocodeCache:
+    """Persistent reverse-geocode cache keyed by quantized lat/lon cells."""
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, ttl=GEOCODE_TTL, max_entries=GEOCODE_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            cell TEXT PRIMARY KEY,
+            location TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_last_used ON geocode_cache(last_used)")
+        self.conn.commit()
+
+    def get(self, lat, lon):
+        key = cell_key(lat, lon)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT location, created_at, last_used FROM geocode_cache WHERE cell = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self.conn.execute("DELETE FROM geocode_cache WHERE cell = ?", (key,))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            if now - row[2] > GEOCODE_TOUCH_INTERVAL:
+                self.conn.execute("UPDATE geocode_cache SET last_used = ? WHERE cell = ?", (now, key))
+                self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, lat, lon, location):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (cell, location, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (cell_key(lat, lon), json.dumps(location), now, now),
+            )
+            self._writes += 1
+            # Eviction is cheap but not free, so only sweep every so often
+            if self._writes % 100 == 0:
+                self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute("DELETE FROM geocode_cache WHERE created_at < ?", (now - self.ttl,))
+        count = self.conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM geocode_cache WHERE cell IN "
+                "(SELECT cell FROM geocode_cache ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# ================= OFFLINE GAZETTEER =================
+
+def load_centroids(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            {**row, "lat": float(row["lat"]), "lon": float(row["lon"])}
+            for row in csv.DictReader(f)
+        ]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def nearest_centroid(lat, lon, places):
+    best, best_km = None, None
+    for place in places:
+        km = haversine_km(lat, lon, place["lat"], place["lon"])
+        if best_km is None or km < best_km:
+            best, best_km = place, km
+    return best, best_km
+
+
+STATE_CENTROIDS = load_centroids(STATE_CENTROIDS_PATH)
+DISTRICT_CENTROIDS = load_centroids(DISTRICT_CENTROIDS_PATH)
+
+
+def offline_reverse_geocode(lat, lon):
+    """
+    Nearest-centroid guess of the farmer's state (and district, when a district
+    file is present). It is coarse near borders, so it is a fallback rather
+    than a replacement for OpenCage.
+    """
+    if DISTRICT_CENTROIDS:
+        place, km = nearest_centroid(lat, lon, DISTRICT_CENTROIDS)
+        if place and km <= OFFLINE_MAX_KM:
+            return {"city": None, "district": place["district"], "state": place["state"]}
+    place, km = nearest_centroid(lat, lon, STATE_CENTROIDS)
+    if place and km <= OFFLINE_MAX_KM:
+        return {"city": None, "district": None, "state": place["state"]}
+    return None
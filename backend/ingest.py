@@ -1,18 +1,60 @@
+import argparse
 import os
-from main import (
+
+from ingest_pipeline import IngestPipeline, default_jobs, INGEST_WORKERS
+from ingest_steps import (
     ingest_state_txts,
     ingest_all_csvs,
     ingest_pdfs,
     ingest_seed_csvs,
     ingest_sqlite_db
 )
+from consolidate_index import consolidate
+from ingestion import reset_collection
+from manifest import IngestManifest
+from resources import get_embedding_model, get_stores
+from tabular import build_tabular_db, TABULAR_DB_PATH
 
 # Path to the SQLite DB in the same directory
 db_file_path = os.path.join(os.path.dirname(__file__), "agri_market.db")
 
-# Run ingestion steps
-ingest_state_txts()
-ingest_all_csvs()
-ingest_pdfs()
-ingest_seed_csvs()
-ingest_sqlite_db(db_file_path, "market_prices", chunk_size=500)  # Larger chunk size for performance
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest the data folders into the Chroma stores")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="clear the stores and the manifest first (needed once for stores built without it)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="run the ingest_* functions one after another instead of the pipeline")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="parser processes")
+    parser.add_argument("--consolidate", action="store_true",
+                        help="then sync the consolidated store used with VECTOR_INDEX=consolidated")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        for store in get_stores().values():
+            reset_collection(store)
+        IngestManifest().reset()
+        if os.path.exists(TABULAR_DB_PATH):
+            os.remove(TABULAR_DB_PATH)
+
+    # Tables behind the structured lookups; only changed files are reloaded
+    build_tabular_db(manifest=IngestManifest())
+
+    if args.sequential:
+        # Run ingestion steps; unchanged files and chunks are skipped
+        ingest_state_txts()
+        ingest_all_csvs()
+        ingest_pdfs()
+        ingest_seed_csvs()
+        ingest_sqlite_db(db_file_path, "market_prices", chunk_size=500)  # Larger chunk size for performance
+    else:
+        # Pipeline workers are spawned and re-import this file; everything
+        # heavy is created lazily here, so they never load the model
+        IngestPipeline(get_stores(), get_embedding_model(), workers=args.workers).run(default_jobs(db_file_path))
+
+    if args.consolidate:
+        consolidate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Pipelined ingestion: files are parsed in a process pool, new chunks go
+through one batched embedding stage, and each Chroma collection gets its
+own writer thread. Stages are connected by bounded queues so a slow stage
+applies backpressure instead of buffering whole datasets in memory.
+
+    parse (N processes) -> diff vs manifest -> embed (1 thread, batched) -> write (1 thread per collection)
+
+Parsers stream their chunks back through a bounded queue, so no stage
+ever holds a whole file.
+"""
+import glob
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bm25 import open_index, index_path
+from ingestion import INGEST_BATCH_SIZE
+from loaders import iter_chunks, iter_market_chunks, SEED_TABLE_EXTENSIONS
+from manifest import IngestManifest
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Batches allowed to wait between two stages
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+# Chunks per message from a parser process to the driver
+PARSE_MESSAGE_CHUNKS = 32
+
+_DONE = object()
+
+
+# ---- parsers: run in worker processes, so keep them top-level and picklable ----
+# Each is a generator of (source, text, metadata) chunks.
+
+def stream_file(path, rows_per_doc, metadata=None):
+    for text, chunk_metadata in iter_chunks(path, rows_per_doc, metadata):
+        yield path, text, chunk_metadata
+
+
+def stream_market_db(db_path, table_name, rows_per_doc):
+    # One source per price date, matching ingest_sqlite_db
+    for source, text in iter_market_chunks(db_path, table_name, rows_per_doc):
+        yield source, text, None
+
+
+def default_jobs(db_path):
+    """
+    (collection, scope, task list) for everything ingest.py loads. A task is
+    (parser, args, path or None); tasks with a path are skipped when the
+    manifest says the file is unchanged.
+    """
+    def files(folder, extensions):
+        return sorted(p for ext in extensions for p in glob.glob(os.path.join(folder, f"*{ext}")))
+
+    def state(path):
+        return {"state": os.path.basename(path).replace(".txt", "")}
+
+    return [
+        ("state_db", "data_states",
+         [(stream_file, (p, 1, state(p)), p) for p in files("data_states", [".txt"])]),
+        ("knowledge_base", "data_csv", [(stream_file, (p, 500), p) for p in files("data_csv", [".csv"])]),
+        ("seed_db", "data_pdf:pdf", [(stream_file, (p, 1), p) for p in files("data_pdf", [".pdf"])]),
+        ("seed_db", "data_pdf:csv", [(stream_file, (p, 5), p) for p in files("data_pdf", SEED_TABLE_EXTENSIONS)]),
+        ("custom_db", "market_prices", [(stream_market_db, (db_path, "market_prices", 500), None)]),
+    ]
+
+
+_results = None
+
+
+def _init_worker(results):
+    global _results
+    _results = results
+
+
+def _run_parse(task_id, parser, args):
+    """Stream a parser's chunks back to the driver in small messages."""
+    busy = 0.0
+    try:
+        batch = []
+        chunks = parser(*args)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            busy += time.perf_counter() - start
+            if chunk is None:
+                break
+            batch.append(chunk)
+            if len(batch) >= PARSE_MESSAGE_CHUNKS:
+                # Blocks when the driver is behind, which pauses this parser
+                _results.put(("chunks", task_id, batch))
+                batch = []
+        if batch:
+            _results.put(("chunks", task_id, batch))
+        _results.put(("done", task_id, busy))
+    except Exception as e:
+        _results.put(("error", task_id, f"{type(e).__name__}: {e}"))
+
+
+class StageStats:
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items, seconds):
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def line(self, wall):
+        rate = self.items / self.busy if self.busy else 0.0
+        return (f"{self.name:<22} {self.items:>9} {self.unit:<7} busy {self.busy:>8.1f}s "
+                f"({rate:,.0f} {self.unit}/s busy, {self.items / wall if wall else 0:,.0f}/s wall)")
+
+
+class IngestPipeline:
+    def __init__(self, stores, embedding_model, workers=INGEST_WORKERS,
+                 batch_size=INGEST_BATCH_SIZE, queue_size=INGEST_QUEUE_SIZE, manifest=None):
+        self.stores = stores
+        self.embedding_model = embedding_model
+        self.workers = workers
+        self.batch_size = batch_size
+        self.manifest = manifest or IngestManifest()
+        self.embed_queue = queue.Queue(maxsize=queue_size)
+        self.write_queues = {name: queue.Queue(maxsize=queue_size) for name in stores}
+        # BM25 indexes follow the same adds and deletes as the collections
+        self.bm25 = {name: open_index(store) for name, store in stores.items()}
+        self.stats = {
+            "parse": StageStats("parse", "chunks"),
+            "embed": StageStats("embed", "chunks"),
+        }
+        for name in stores:
+            self.stats[f"write:{name}"] = StageStats(f"write:{name}", "chunks")
+        self.failed = False
+        self.skipped_files = 0
+
+    # ---- embed stage ----
+
+    def _embed_loop(self):
+        pending = []
+        while True:
+            item = self.embed_queue.get()
+            if item is not _DONE:
+                pending.extend(item)
+            while len(pending) >= self.batch_size or (item is _DONE and pending):
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                self._embed_batch(batch)
+            if item is _DONE:
+                for q in self.write_queues.values():
+                    q.put(_DONE)
+                return
+
+    def _embed_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            vectors = self.embedding_model.embed_documents([text for _, _, text, _ in batch])
+        except Exception as e:
+            print(f"Error embedding batch of {len(batch)}: {e}")
+            self.failed = True
+            return
+        self.stats["embed"].add(len(batch), time.perf_counter() - start)
+        by_collection = {}
+        for (collection, cid, text, metadata), vector in zip(batch, vectors):
+            by_collection.setdefault(collection, []).append((cid, text, metadata, vector))
+        for collection, rows in by_collection.items():
+            self.write_queues[collection].put(("upsert", rows))
+
+    # ---- write stage ----
+
+    def _write_loop(self, name):
+        store = self.stores[name]
+        stats = self.stats[f"write:{name}"]
+        while True:
+            item = self.write_queues[name].get()
+            if item is _DONE:
+                break
+            op, payload = item
+            start = time.perf_counter()
+            try:
+                if op == "delete":
+                    store.delete(ids=payload)
+                    self.bm25[name].remove(payload)
+                    continue
+                ids, texts, metadatas, vectors = map(list, zip(*payload))
+                # Chroma rejects empty metadata dicts, so only pass them when something is set
+                store._collection.upsert(
+                    ids=ids, embeddings=vectors, documents=texts,
+                    metadatas=metadatas if any(metadatas) else None,
+                )
+                self.bm25[name].add(ids, texts)
+                stats.add(len(ids), time.perf_counter() - start)
+            except Exception as e:
+                print(f"Error writing to {name}: {e}")
+                self.failed = True
+        try:
+            store.persist()
+        except Exception as e:
+            print(f"Error persisting {name}: {e}")
+            self.failed = True
+
+    # ---- parse stage + driver ----
+
+    def _pending_tasks(self, jobs):
+        for collection, scope, tasks in jobs:
+            for parser, args, path in tasks:
+                if path is not None and self.manifest.file_unchanged(collection, path, path):
+                    self.skipped_files += 1
+                    continue
+                yield collection, scope, parser, args, path
+
+    def run(self, jobs):
+        wall_start = time.perf_counter()
+        threads = [threading.Thread(target=self._embed_loop, name="ingest-embed")]
+        threads += [threading.Thread(target=self._write_loop, args=(name,), name=f"ingest-write-{name}")
+                    for name in self.stores]
+        for t in threads:
+            t.start()
+
+        present = {(collection, scope): set() for collection, scope, _ in jobs}
+        # spawn, not fork: the parent already holds the embedding model's threads
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue(maxsize=self.workers * 4)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                     initializer=_init_worker, initargs=(results,)) as pool:
+                tasks = {}
+                for task_id, (collection, scope, parser, args, path) in enumerate(self._pending_tasks(jobs)):
+                    future = pool.submit(_run_parse, task_id, parser, args)
+                    # A file's diff exists up front so an emptied file still deletes its old chunks
+                    diffs = {path: self.manifest.source_diff(collection, path)} if path is not None else {}
+                    tasks[task_id] = {"collection": collection, "scope": scope, "path": path,
+                                      "label": args[0], "future": future, "diffs": diffs}
+                self._collect(tasks, results, present)
+        finally:
+            self.embed_queue.put(_DONE)
+            for t in threads:
+                t.join()
+
+        if not self.failed:
+            self._prune(jobs, present)
+        for name, index in self.bm25.items():
+            index.save(index_path(self.stores[name]._collection.name))
+        if self.failed:
+            print("Ingestion had errors; the manifest was not updated, rerun to retry")
+            self.manifest.rollback()
+        else:
+            self.manifest.commit()
+        self.report(time.perf_counter() - wall_start)
+        return not self.failed
+
+    def _collect(self, tasks, results, present):
+        """Diff streamed chunks against the manifest and feed new ones to the embed stage."""
+        outstanding = set(tasks)
+        to_embed = []
+        while outstanding:
+            try:
+                kind, task_id, payload = results.get(timeout=1.0)
+            except queue.Empty:
+                # A worker that died never reports back; its future holds the error
+                for task_id in list(outstanding):
+                    future = tasks[task_id]["future"]
+                    if future.done() and future.exception() is not None:
+                        print(f"Error parsing {tasks[task_id]['label']}: {future.exception()}")
+                        self.failed = True
+                        outstanding.discard(task_id)
+                continue
+            task = tasks[task_id]
+            if kind == "chunks":
+                collection = task["collection"]
+                for source, text, metadata in payload:
+                    diff = task["diffs"].get(source)
+                    if diff is None:
+                        diff = task["diffs"][source] = self.manifest.source_diff(collection, source)
+                    cid = diff.add(text)
+                    if cid is not None:
+                        to_embed.append((collection, cid, text, metadata or {}))
+                self.stats["parse"].add(len(payload), 0.0)
+                if len(to_embed) >= self.batch_size:
+                    self.embed_queue.put(to_embed)
+                    to_embed = []
+            elif kind == "done":
+                self.stats["parse"].add(0, payload)
+                self._finish_task(task, present)
+                outstanding.discard(task_id)
+            else:
+                print(f"Error parsing {task['label']}: {payload}")
+                self.failed = True
+                outstanding.discard(task_id)
+        if to_embed:
+            self.embed_queue.put(to_embed)
+
+    def _finish_task(self, task, present):
+        collection, scope = task["collection"], task["scope"]
+        for source, diff in task["diffs"].items():
+            removed = diff.removed()
+            if removed:
+                self.write_queues[collection].put(("delete", removed))
+            self.manifest.record_file(collection, source, scope, task["path"] if source == task["path"] else None)
+            present[(collection, scope)].add(source)
+        task["diffs"] = {}
+
+    def _prune(self, jobs, present):
+        # Sources that are gone from disk; files skipped as unchanged still exist
+        for collection, scope, tasks in jobs:
+            listed = {path for _, _, path in tasks if path}
+            gone = self.manifest.prune(collection, scope, present[(collection, scope)] | listed)
+            if gone:
+                self.stores[collection].delete(ids=gone)
+                self.bm25[collection].remove(gone)
+
+    def report(self, wall):
+        print(f"Ingestion finished in {wall:.1f}s ({self.skipped_files} unchanged files skipped)")
+        for stats in self.stats.values():
+            print("  " + stats.line(wall))
@@ -0,0 +1,90 @@
+"""
+The ingest_* steps ingest.py runs, one per data folder. They only need the
+stores and the embedding model, so importing this module doesn't start
+the API.
+"""
+import glob
+import itertools
+import os
+
+from ingestion import BatchedWriter, finish, sync_file, sync_source, report, INGEST_BATCH_SIZE
+from loaders import iter_chunks, iter_market_chunks, SEED_TABLE_EXTENSIONS
+from manifest import IngestManifest
+from resources import get_store
+
+
+def ingest_all_csvs(folder_path="data_csv", chunk_size=500, batch_size=INGEST_BATCH_SIZE):
+    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
+    manifest = IngestManifest()
+    with BatchedWriter(get_store("knowledge_base"), batch_size) as writer:
+        for csv_file in csv_files:
+            try:
+                sync_file(writer, manifest, csv_file, folder_path, lambda: iter_chunks(csv_file, chunk_size))
+            except Exception as e:
+                print(f"Error ingesting {csv_file}: {e}")
+        writer.delete(manifest.prune(writer.collection, folder_path, csv_files))
+    finish(writer, manifest)
+    report(writer)
+
+
+def ingest_pdfs(folder_path="data_pdf"):
+    pdf_files = glob.glob(os.path.join(folder_path, "*.pdf"))
+    manifest = IngestManifest()
+    with BatchedWriter(get_store("seed_db")) as writer:
+        for pdf_file in pdf_files:
+            try:
+                sync_file(writer, manifest, pdf_file, f"{folder_path}:pdf", lambda: iter_chunks(pdf_file))
+            except Exception as e:
+                print(f"Error ingesting {pdf_file}: {e}")
+        writer.delete(manifest.prune(writer.collection, f"{folder_path}:pdf", pdf_files))
+    finish(writer, manifest)
+    report(writer)
+
+def ingest_seed_csvs(folder_path="data_pdf", chunk_size=5, batch_size=INGEST_BATCH_SIZE):
+    # Every tabular seed file, spreadsheets included
+    csv_files = [p for ext in SEED_TABLE_EXTENSIONS for p in glob.glob(os.path.join(folder_path, f"*{ext}"))]
+    manifest = IngestManifest()
+    with BatchedWriter(get_store("seed_db"), batch_size) as writer:
+        for csv_file in csv_files:
+            try:
+                sync_file(writer, manifest, csv_file, f"{folder_path}:csv", lambda: iter_chunks(csv_file, chunk_size))
+            except Exception as e:
+                print(f"Error ingesting seed file {csv_file}: {e}")
+        writer.delete(manifest.prune(writer.collection, f"{folder_path}:csv", csv_files))
+    finish(writer, manifest)
+    report(writer)
+
+def ingest_state_txts(folder_path="data_states"):
+    txt_files = glob.glob(os.path.join(folder_path, "*.txt"))
+    manifest = IngestManifest()
+    with BatchedWriter(get_store("state_db")) as writer:
+        for txt_file in txt_files:
+            try:
+                state_name = os.path.basename(txt_file).replace(".txt", "")
+                sync_file(writer, manifest, txt_file, folder_path,
+                          lambda: iter_chunks(txt_file, metadata={"state": state_name}))
+            except Exception as e:
+                print(f"Error ingesting {txt_file}: {e}")
+        writer.delete(manifest.prune(writer.collection, folder_path, txt_files))
+    finish(writer, manifest)
+    report(writer)
+
+# # Dynamically build the absolute path for the DB file
+db_file_path = os.path.join(os.path.dirname(__file__), "agri_market.db")    
+
+def ingest_sqlite_db(db_path, table_name, chunk_size=500, batch_size=INGEST_BATCH_SIZE):
+    try:
+        manifest = IngestManifest()
+        with BatchedWriter(get_store("custom_db"), batch_size) as writer:
+            # The table grows by a day at a time, so chunk per price date: old
+            # days keep the same chunks and ids and only new days get embedded
+            sources = []
+            for source, chunks in itertools.groupby(iter_market_chunks(db_path, table_name, chunk_size), key=lambda c: c[0]):
+                sources.append(source)
+                sync_source(writer, manifest, source, table_name, ((text, None) for _, text in chunks))
+            writer.delete(manifest.prune(writer.collection, table_name, sources))
+        finish(writer, manifest)
+        report(writer)
+        print(f"Ingested {len(sources)} price dates from {db_path} into custom_db")
+    except Exception as e:
+        print(f"Error ingesting {db_path}: {e}")
@@ -0,0 +1,142 @@
+import os
+
+from bm25 import open_index, index_path
+
+# Texts per add_texts call; bigger batches keep the embedding model busy
+# instead of paying per-call overhead on tiny batches
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+
+def serialize_rows(df):
+    """
+    "col: value | col: value" for every row of `df`, built column by column
+    instead of looping over df.iterrows().
+    """
+    if df.empty:
+        return []
+    text = None
+    for col in df.columns:
+        part = f"{col}: " + df[col].astype(str)
+        text = part if text is None else text + " | " + part
+    return text.tolist()
+
+
+def group_rows(texts, rows_per_doc):
+    """Join consecutive serialized rows into one document per `rows_per_doc` rows."""
+    return ["\n".join(texts[i:i + rows_per_doc]) for i in range(0, len(texts), rows_per_doc)]
+
+
+class BatchedWriter:
+    """
+    Buffers texts for a Chroma store and writes them in batches of `batch_size`.
+    A failed write is logged and sets `failed`, so the caller can roll the
+    manifest back instead of recording chunks that never reached Chroma.
+    """
+
+    def __init__(self, store, batch_size=INGEST_BATCH_SIZE):
+        self.store = store
+        self.collection = store._collection.name
+        self.bm25 = open_index(store)
+        self.batch_size = batch_size
+        self.written = 0
+        self.deleted = 0
+        self.failed = False
+        self._texts = []
+        self._metadatas = []
+        self._ids = []
+
+    def add(self, texts, metadatas=None, ids=None):
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas or [{} for _ in texts])
+        self._ids.extend(ids or [None for _ in texts])
+        while len(self._texts) >= self.batch_size:
+            self._write(self.batch_size)
+
+    def delete(self, ids):
+        if ids:
+            try:
+                self.store.delete(ids=list(ids))
+            except Exception as e:
+                print(f"Error deleting {len(ids)} chunks from {self.collection}: {e}")
+                self.failed = True
+                return
+            self.bm25.remove(ids)
+            self.deleted += len(ids)
+
+    def flush(self):
+        while self._texts:
+            self._write(self.batch_size)
+
+    def _write(self, n):
+        texts, self._texts = self._texts[:n], self._texts[n:]
+        metadatas, self._metadatas = self._metadatas[:n], self._metadatas[n:]
+        ids, self._ids = self._ids[:n], self._ids[n:]
+        # Chroma rejects empty metadata dicts, so only pass them when something is set
+        try:
+            self.store.add_texts(
+                texts,
+                metadatas=metadatas if any(metadatas) else None,
+                ids=ids if all(ids) else None,
+            )
+        except Exception as e:
+            print(f"Error writing {len(texts)} chunks to {self.collection}: {e}")
+            self.failed = True
+            return
+        if all(ids):
+            self.bm25.add(ids, texts)
+        self.written += len(texts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        self.store.persist()
+        self.bm25.save(index_path(self.collection))
+
+
+def sync_source(writer, manifest, source, scope, chunks, path=None):
+    """
+    Embed only the (text, metadata) chunks of `source` that aren't in the
+    manifest yet and delete the ones that disappeared from it. `chunks` can
+    be a generator; it is consumed one chunk at a time.
+    """
+    diff = manifest.source_diff(writer.collection, source)
+    added = 0
+    for cid, text, metadata in diff.new_chunks(chunks):
+        writer.add([text], [metadata] if metadata else None, ids=[cid])
+        added += 1
+    removed = diff.removed()
+    writer.delete(removed)
+    manifest.record_file(writer.collection, source, scope, path)
+    return added, len(removed)
+
+
+def sync_file(writer, manifest, path, scope, make_chunks):
+    """Re-chunk `path` only if it changed since the last run; `make_chunks` returns the chunk stream."""
+    if manifest.file_unchanged(writer.collection, path, path):
+        return 0, 0
+    return sync_source(writer, manifest, path, scope, make_chunks(), path=path)
+
+
+def finish(writer, manifest):
+    """Commit the manifest only if every Chroma write and delete went through."""
+    if writer.failed:
+        print(f"{writer.collection}: writes failed; the manifest was not updated, rerun to retry")
+        manifest.rollback()
+    else:
+        manifest.commit()
+
+
+def report(writer):
+    print(f"{writer.collection}: embedded {writer.written} new chunks, deleted {writer.deleted}")
+
+
+def reset_collection(store, batch_size=5000):
+    """Remove every document from a Chroma store (used by ingest.py --rebuild)."""
+    ids = store.get()["ids"]
+    for start in range(0, len(ids), batch_size):
+        store.delete(ids=ids[start:start + batch_size])
+    path = index_path(store._collection.name)
+    if os.path.exists(path):
+        os.remove(path)
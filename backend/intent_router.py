@@ -0,0 +1,174 @@
+"""
+Decides per question which retrievals, external APIs and prompt sections
+are worth running. A compiled keyword pattern per intent tags the
+question; a nearest-centroid classifier over the query embedding (which
+/ask computes anyway) catches paraphrases the keywords miss. Everything
+not in the resulting plan is skipped.
+"""
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+# Cosine similarity to an intent's centroid above which the intent applies
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", "0.5"))
+
+# Word prefixes, so "irrigat" covers irrigate/irrigation and "fertili" fertilizer/fertiliser
+INTENT_KEYWORDS = {
+    "market": ["price", "market", "mandi", "sell", "rate", "bhav", "msp"],
+    "weather": ["rain", "weather", "temperature", "forecast", "humidity", "wind"],
+    "irrigation": ["irrigat", "water", "moisture", "soil", "drip", "sprinkler"],
+    "cold": ["cold", "frost", "chill", "temperature drop"],
+    "seeds": ["seed", "variety", "varieties", "hybrid", "resistan", "tolerant"],
+    "schemes": ["loan", "credit", "subsidy", "insurance", "pmksy", "pm-kisan", "scheme", "government", "grant", "kcc"],
+    "crop_care": ["fertili", "urea", "npk", "nitrogen", "manure", "pest", "disease", "insect", "fung", "spray", "yield", "sow"],
+}
+
+INTENT_PROTOTYPES = {
+    "market": [
+        "What is the price of onion in the mandi today?",
+        "Where can I sell my cotton at a better rate?",
+        "Modal price of wheat in nearby markets",
+    ],
+    "weather": [
+        "Will it rain this week in my village?",
+        "What is the weather forecast for the next few days?",
+    ],
+    "irrigation": [
+        "When should I irrigate my wheat crop?",
+        "How much water does sugarcane need in summer?",
+        "Soil moisture is low, should I water the field?",
+    ],
+    "cold": [
+        "Will the cold nights damage my potato crop?",
+        "How do I protect tomatoes from frost?",
+    ],
+    "seeds": [
+        "Which rice variety is best for drought-prone areas?",
+        "Recommend a high yielding hybrid maize seed",
+    ],
+    "schemes": [
+        "How do I get a subsidy for drip irrigation?",
+        "Which government scheme gives crop insurance?",
+        "Can I get a Kisan Credit Card loan?",
+    ],
+    "crop_care": [
+        "Which fertilizer should I apply to paddy?",
+        "How do I control aphids on mustard?",
+        "What is the expected yield of groundnut per hectare?",
+    ],
+}
+
+# Sources each intent needs: retrieval corpora (Chroma collections and the
+# in-memory state index), then APIs and local lookups. custom_db holds
+# document dumps of the market table, so only price questions use it
+INTENT_SOURCES = {
+    "market": ({"custom_db"}, {"market_db"}),
+    "weather": ({"states"}, {"weather", "soil"}),
+    "irrigation": ({"knowledge_base", "states"}, {"weather", "soil", "tables"}),
+    "cold": ({"seed_db"}, {"forecast", "tables"}),
+    "seeds": ({"seed_db", "states"}, set()),
+    "schemes": ({"seed_db", "states"}, set()),
+    "crop_care": ({"knowledge_base", "seed_db", "states"}, {"tables"}),
+}
+# Questions no intent claims get the general agronomy sources
+GENERAL_SOURCES = ({"knowledge_base", "seed_db", "states"}, {"tables"})
+ALL_COLLECTIONS = {"knowledge_base", "seed_db", "states", "custom_db"}
+# Geocoding always runs: the answer cache, the state filter and the market
+# lookup are all keyed by the farmer's location
+ALL_APIS = {"geocode", "weather", "soil", "forecast", "market_db", "tables"}
+
+# One pattern per intent: a single alternation would let "temperature"
+# (weather) consume the text before "temperature drop" (cold) could match
+_KEYWORDS = {
+    intent: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + ")")
+    for intent, words in INTENT_KEYWORDS.items()
+}
+
+
+def keyword_intents(text):
+    text = text.lower()
+    return {intent for intent, pattern in _KEYWORDS.items() if pattern.search(text)}
+
+
+class Plan:
+    def __init__(self, intents, matched_by):
+        self.intents = intents
+        self.matched_by = matched_by
+        collections, apis = set(), {"geocode"}
+        for intent in intents or ["general"]:
+            c, a = INTENT_SOURCES.get(intent, GENERAL_SOURCES)
+            collections |= c
+            apis |= a
+        self.collections = collections
+        self.apis = apis
+
+    def uses(self, source):
+        return source in self.collections or source in self.apis
+
+    @property
+    def cache_intent(self):
+        """Bucket for the answer cache; prices and forecasts expire daily."""
+        if "market" in self.intents:
+            return "market"
+        if self.intents & {"weather", "irrigation", "cold"}:
+            return "weather"
+        return "agronomy"
+
+    def skipped(self):
+        return sorted((ALL_COLLECTIONS - self.collections) | (ALL_APIS - self.apis))
+
+    def describe(self):
+        return (
+            f"intents={sorted(self.intents) or ['general']} ({self.matched_by}) "
+            f"collections={sorted(self.collections)} apis={sorted(self.apis)} skipped={self.skipped()}"
+        )
+
+
+class IntentRouter:
+    def __init__(self, embedding_model):
+        self.embedding_model = embedding_model
+        self.labels = list(INTENT_PROTOTYPES)
+        self.centroids = None
+        self.plans = 0
+        self.skipped = Counter()
+        self.by_intent = Counter()
+
+    def _centroids(self):
+        if self.centroids is None:
+            rows = []
+            for label in self.labels:
+                vectors = np.asarray(self.embedding_model.embed_documents(INTENT_PROTOTYPES[label]), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                centroid = vectors.mean(axis=0)
+                rows.append(centroid / np.linalg.norm(centroid))
+            self.centroids = np.stack(rows)
+        return self.centroids
+
+    def embedding_intents(self, vector):
+        query = np.asarray(vector, dtype=np.float32)
+        scores = self._centroids() @ (query / np.linalg.norm(query))
+        return {label for label, score in zip(self.labels, scores) if score >= INTENT_THRESHOLD}
+
+    def plan(self, query_en, vector):
+        by_keyword = keyword_intents(query_en)
+        try:
+            by_embedding = self.embedding_intents(vector)
+        except Exception as e:
+            print(f"Intent classifier unavailable, using keywords only: {e}")
+            by_embedding = set()
+        matched_by = []
+        if by_keyword:
+            matched_by.append("keywords")
+        if by_embedding - by_keyword:
+            matched_by.append("embedding")
+        plan = Plan(by_keyword | by_embedding, "+".join(matched_by) or "none")
+        self.plans += 1
+        self.skipped.update(plan.skipped())
+        self.by_intent.update(plan.intents or ["general"])
+        print(f"Plan: {plan.describe()}")
+        return plan
+
+    def stats(self):
+        return {"plans": self.plans, "intents": dict(self.by_intent), "skipped": dict(self.skipped)}
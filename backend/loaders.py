@@ -0,0 +1,144 @@
+"""
+Streaming loaders keyed by file extension. Each loader yields
+(text, metadata) chunks one at a time and never holds the whole file, so
+ingestion memory stays flat however big the source is.
+"""
+import os
+import sqlite3
+
+import pandas as pd
+
+from ingestion import serialize_rows, group_rows
+
+# Rows read per pandas/openpyxl batch; rounded to a multiple of rows_per_doc
+LOADER_BATCH_ROWS = int(os.getenv("LOADER_BATCH_ROWS", "10000"))
+# Text files are cut at paragraph breaks into blocks of about this size
+TXT_BLOCK_CHARS = int(os.getenv("TXT_BLOCK_CHARS", "4000"))
+
+LOADERS = {}
+# Tabular files in the seed folder (ingest_seed_csvs)
+SEED_TABLE_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+
+
+def register(*extensions):
+    def wrap(fn):
+        for ext in extensions:
+            LOADERS[ext] = fn
+        return fn
+    return wrap
+
+
+def supported(path):
+    return os.path.splitext(path)[1].lower() in LOADERS
+
+
+def iter_chunks(path, rows_per_doc=500, metadata=None):
+    """Stream (text, metadata) chunks from `path` using the loader for its extension."""
+    loader = LOADERS.get(os.path.splitext(path)[1].lower())
+    if loader is None:
+        raise ValueError(f"No loader registered for {path}")
+    for text in loader(path, rows_per_doc):
+        yield text, dict(metadata or {})
+
+
+def _batch_rows(rows_per_doc):
+    # Keep document boundaries where a whole-file read would put them
+    return max(1, LOADER_BATCH_ROWS // rows_per_doc) * rows_per_doc
+
+
+@register(".csv")
+def load_csv(path, rows_per_doc):
+    for df in pd.read_csv(path, chunksize=_batch_rows(rows_per_doc)):
+        yield from group_rows(serialize_rows(df), rows_per_doc)
+
+
+@register(".xlsx", ".xlsm")
+def load_xlsx(path, rows_per_doc):
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the workbook in memory
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            columns = [str(c) if c is not None else f"column_{i}" for i, c in enumerate(header)]
+            batch = []
+            for row in rows:
+                if all(v is None for v in row):
+                    continue
+                # Read-only rows can be shorter or longer than the header
+                batch.append(tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row)))
+                if len(batch) == _batch_rows(rows_per_doc):
+                    yield from _sheet_docs(batch, columns, rows_per_doc)
+                    batch = []
+            if batch:
+                yield from _sheet_docs(batch, columns, rows_per_doc)
+    finally:
+        wb.close()
+
+
+def _sheet_docs(batch, columns, rows_per_doc):
+    df = pd.DataFrame.from_records(batch, columns=columns)
+    return group_rows(serialize_rows(df), rows_per_doc)
+
+
+@register(".pdf")
+def load_pdf(path, rows_per_doc):
+    from langchain.document_loaders import PyPDFLoader
+
+    for doc in PyPDFLoader(path).lazy_load():
+        if doc.page_content.strip():
+            yield doc.page_content
+
+
+@register(".txt")
+def load_txt(path, rows_per_doc):
+    block, size = [], 0
+    paragraph = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            paragraph.append(line)
+            if line.strip():
+                continue
+            # Blank line: the paragraph is complete
+            text = "".join(paragraph)
+            paragraph = []
+            if size + len(text) > TXT_BLOCK_CHARS and block:
+                yield "".join(block).strip()
+                block, size = [], 0
+            block.append(text)
+            size += len(text)
+    block += paragraph
+    text = "".join(block).strip()
+    if text:
+        yield text
+
+
+def iter_market_chunks(db_path, table_name, rows_per_doc=500):
+    """
+    Stream (source, text) chunks from the market table, one source per
+    price date, reading the table in batches ordered by date.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        pending = None
+        # rowid breaks ties so rows within a date, and so chunk boundaries and ids, are the same every run
+        query = f'SELECT * FROM {table_name} ORDER BY "Price Date", rowid'
+        for df in pd.read_sql_query(query, conn, chunksize=LOADER_BATCH_ROWS):
+            if pending is not None:
+                df = pd.concat([pending, df], ignore_index=True)
+            # The last date may continue in the next batch
+            last = df["Price Date"].iloc[-1]
+            pending = df[df["Price Date"] == last]
+            for price_date, day in df[df["Price Date"] != last].groupby("Price Date", sort=False):
+                for text in group_rows(serialize_rows(day), rows_per_doc):
+                    yield f"{table_name}:{price_date}", text
+        if pending is not None and not pending.empty:
+            price_date = pending["Price Date"].iloc[0]
+            for text in group_rows(serialize_rows(pending), rows_per_doc):
+                yield f"{table_name}:{price_date}", text
+    finally:
+        conn.close()
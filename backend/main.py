@@ -1,23 +1,39 @@
 import os
-import glob
-import sqlite3
-import pandas as pd
-import httpx
+import asyncio
+import json
 import re
-from fastapi import FastAPI, Form
+from fastapi import FastAPI, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from groq import Groq
+from fastapi.responses import StreamingResponse, JSONResponse
+from groq import AsyncGroq
 from dotenv import load_dotenv
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.document_loaders import PyPDFLoader
-from deep_translator import GoogleTranslator
-from geopy.distance import geodesic
-from auth import router as auth_router
-from user_history import router as user_history_router
 
+# Load .env before the local modules below read their settings
 load_dotenv()
 
+from auth import router as auth_router
+import chat_store
+from chat_migrations import migrate
+from concurrency import run_blocking, with_timeout, gather_sources
+from embeddings import search_by_vector, hybrid_search, search_sources, retrieval_modes
+from resources import (
+    VECTOR_INDEX, BM25_COLLECTIONS, get_consolidated_store, get_query_embeddings, get_store,
+    get_bm25, get_intent_router, get_state_index, get_tabular_store, warmup, is_ready, loaded, peek, warmup_report,
+)
+from geocache import GeocodeCache, offline_reverse_geocode, GEOCODE_OFFLINE
+from user_history import router as user_history_router, MAX_PAGE
+from http_client import get_http_client, close_http_client
+from translation import translate, translation_cache
+from answer_cache import SemanticAnswerCache
+from market import get_market_price_table
+from market_snapshot import current_snapshot, reload_snapshot, watch_market_db
+from commodities import resolve_commodity
+from prompt_builder import Section, assemble, prompt_stats
+from weather import (
+    fetch_daily_forecast, fetch_agweather, format_forecast, format_soil_moisture,
+    min_forecast_temp, weather_cache,
+)
+
 app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
@@ -31,210 +47,92 @@ app.add_middleware(
 app.include_router(auth_router)
 app.include_router(user_history_router)
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-db = Chroma(collection_name="knowledge_base", embedding_function=embedding_model, persist_directory="./chroma_db")
-db_seeds = Chroma(collection_name="seed_db", embedding_function=embedding_model, persist_directory="./chroma_seeds")
-db_states = Chroma(collection_name="state_db", embedding_function=embedding_model, persist_directory="./chroma_states")
-db_custom = Chroma(collection_name="custom_db", embedding_function=embedding_model, persist_directory="./chroma_custom")
-
-# ================= INGESTION FUNCTIONS =================
-
-def ingest_all_csvs(folder_path="data_csv", chunk_size=500):
-    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-    for csv_file in csv_files:
-        try:
-            df = pd.read_csv(csv_file)
-            for start_idx in range(0, len(df), chunk_size):
-                chunk_rows = df.iloc[start_idx: start_idx + chunk_size]
-                chunk_texts = [" | ".join([f"{col}: {row[col]}" for col in chunk_rows.columns]) for _, row in chunk_rows.iterrows()]
-                # Add each batch immediately to avoid large memory usage
-                db.add_texts(["\n".join(chunk_texts)])
-        except Exception as e:
-            print(f"Error ingesting {csv_file}: {e}")
-    db.persist()
-
-
 
-def ingest_pdfs(folder_path="data_pdf"):
-    pdf_files = glob.glob(os.path.join(folder_path, "*.pdf"))
-    for pdf_file in pdf_files:
-        try:
-            loader = PyPDFLoader(pdf_file)
-            documents = loader.load()
-            texts = [doc.page_content for doc in documents]
-            db_seeds.add_texts(texts)
-        except Exception as e:
-            print(f"Error ingesting {pdf_file}: {e}")
-    db_seeds.persist()
-
-def ingest_seed_csvs(folder_path="data_pdf", chunk_size=5):
-    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-    for csv_file in csv_files:
-        try:
-            df = pd.read_csv(csv_file)
-            new_texts = []
-            for start_idx in range(0, len(df), chunk_size):
-                chunk_rows = df.iloc[start_idx: start_idx + chunk_size]
-                chunk_texts = [
-                    " | ".join([f"{col}: {row[col]}" for col in chunk_rows.columns])
-                    for _, row in chunk_rows.iterrows()
-                ]
-                new_texts.append("\n".join(chunk_texts))
-            db_seeds.add_texts(new_texts)
-        except Exception as e:
-            print(f"Error ingesting seed CSV {csv_file}: {e}")
-    db_seeds.persist()
+@app.on_event("startup")
+async def startup():
+    # Create or upgrade the chat tables and indexes
+    await run_blocking(migrate)
+    # Serve price lookups from memory; the watcher hot-swaps it after each daily scrape
+    await run_blocking(reload_snapshot)
+    app.state.market_watcher = asyncio.create_task(watch_market_db())
+    # Load the model and stores in the background: /healthz answers right
+    # away and /readyz flips once warmup is done
+    app.state.warmup = asyncio.create_task(run_blocking(warmup))
 
-def ingest_state_txts(folder_path="data_states"):
-    txt_files = glob.glob(os.path.join(folder_path, "*.txt"))
-    for txt_file in txt_files:
-        try:
-            state_name = os.path.basename(txt_file).replace(".txt", "")
-            with open(txt_file, "r", encoding="utf-8") as f:
-                content = f.read()
-            db_states.add_texts([content], metadatas=[{"state": state_name}])
-        except Exception as e:
-            print(f"Error ingesting {txt_file}: {e}")
-    db_states.persist()
 
-# # Dynamically build the absolute path for the DB file
-db_file_path = os.path.join(os.path.dirname(__file__), "agri_market.db")    
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.market_watcher.cancel()
+    await close_http_client()
+    # Commit any queued chat messages before the process exits
+    await run_blocking(chat_store.close)
 
-def ingest_sqlite_db(db_path, table_name, chunk_size=500):
-    try:
-        conn = sqlite3.connect(db_path)
-        query = f"SELECT * FROM {table_name}"
-        df = pd.read_sql_query(query, conn)
-        new_texts = []
-        for start_idx in range(0, len(df), chunk_size):
-            chunk_rows = df.iloc[start_idx: start_idx + chunk_size]
-            chunk_texts = [
-                " | ".join([f"{col}: {row[col]}" for col in chunk_rows.columns])
-                for _, row in chunk_rows.iterrows()
-            ]
-            new_texts.append("\n".join(chunk_texts))
-        db_custom.add_texts(new_texts)
-        db_custom.persist()
-        conn.close()
-        print(f"Ingested {len(df)} rows from {db_path} into custom_db")
-    except Exception as e:
-        print(f"Error ingesting {db_path}: {e}")
+client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+LLM_MODEL = "llama3-8b-8192"
+# The embedding model, Chroma stores, BM25 indexes and tabular store live in resources.py;
+# they are built by warmup() after startup, or on first use
 
 # ================= DATABASE & MESSAGE HISTORY =================
 
-conn = sqlite3.connect("chat_history.db", check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS messages (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id TEXT,
-    role TEXT,
-    content TEXT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-""")
-conn.commit()
-
-# Ensure chats table exists
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS chats (
-    id TEXT PRIMARY KEY,
-    user_id TEXT,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    title TEXT
-)
-""")
-conn.commit()
-
-# Ensure chat_id column exists in messages table
-cursor.execute("PRAGMA table_info(messages)")
-columns = [col[1] for col in cursor.fetchall()]
-if "chat_id" not in columns:
-    cursor.execute("ALTER TABLE messages ADD COLUMN chat_id TEXT")
-    conn.commit()
 
-def store_message(user_id, role, content, chat_id=None):
-    cursor.execute("INSERT INTO messages (user_id, role, content, chat_id) VALUES (?, ?, ?, ?)", (user_id, role, content, chat_id))
-    conn.commit()
+async def store_message(user_id, role, content, chat_id=None):
+    # Queued to the single chat writer and committed with whatever else is
+    # waiting; the write still lands if this request is cancelled meanwhile
+    await chat_store.writer().awrite(
+        "INSERT INTO messages (user_id, role, content, chat_id) VALUES (?, ?, ?, ?)",
+        (user_id, role, content, chat_id),
+    )
 
 # ================= LOCATION & WEATHER =================
 
-WEATHERBIT_KEY = os.getenv("WEATHERBIT_KEY")
+EMPTY_LOCATION = {"city": None, "district": None, "state": None}
+geocode_cache = GeocodeCache()
+answer_cache = SemanticAnswerCache()
 
 async def reverse_geocode(lat, lon):
+    cached = await run_blocking(geocode_cache.get, lat, lon)
+    if cached is not None:
+        return cached
+    if GEOCODE_OFFLINE == "prefer":
+        offline = offline_reverse_geocode(lat, lon)
+        if offline and offline["district"]:
+            return offline
     try:
         url = "https://api.opencagedata.com/geocode/v1/json"
         params = {"q": f"{lat},{lon}", "key": os.getenv("OPENCAGE_KEY")}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            res = await client.get(url, params=params)
-            data = res.json()
-            if "results" in data and len(data["results"]) > 0:
-                comp = data["results"][0]["components"]
-                city = comp.get("city") or comp.get("town") or comp.get("village")
-                state = comp.get("state")
-                district = comp.get("state_district") or comp.get("county") or comp.get("suburb")
-                return {"city": city, "district": district, "state": state}
+        res = await get_http_client().get(url, params=params, timeout=10.0)
+        data = res.json()
+        if "results" in data and len(data["results"]) > 0:
+            comp = data["results"][0]["components"]
+            city = comp.get("city") or comp.get("town") or comp.get("village")
+            state = comp.get("state")
+            district = comp.get("state_district") or comp.get("county") or comp.get("suburb")
+            location = {"city": city, "district": district, "state": state}
+            await run_blocking(geocode_cache.put, lat, lon, location)
+            return location
     except Exception as e:
         print(f"Error in reverse geocode: {e}")
-    return {"city": None, "district": None, "state": None}
+    if GEOCODE_OFFLINE != "off":
+        offline = offline_reverse_geocode(lat, lon)
+        if offline:
+            return offline
+    return dict(EMPTY_LOCATION)
 
 async def get_soil_moisture(lat, lon):
     try:
-        url = "https://api.weatherbit.io/v2.0/forecast/agweather"
-        params = {"lat": lat, "lon": lon, "key": WEATHERBIT_KEY}
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            res = await client.get(url, params=params)
-            data = res.json()
-            if "data" in data and len(data["data"]) > 0:
-                latest = data["data"][0]
-                moisture_0_10 = latest.get("soilm_0_10cm", "N/A")
-                moisture_10_40 = latest.get("soilm_10_40cm", "N/A")
-                moisture_40_100 = latest.get("soilm_40_100cm", "N/A")
-                moisture_100_200 = latest.get("soilm_100_200cm", "N/A")
-                temp = latest.get("temp_2m_avg", "N/A")
-                precip = latest.get("precip", "N/A")
-                return (
-                    f"Latest Soil Moisture (mm): 0-10cm: {moisture_0_10}, "
-                    f"10-40cm: {moisture_10_40}, 40-100cm: {moisture_40_100}, "
-                    f"100-200cm: {moisture_100_200} | Temp: {temp}°C | Precip: {precip}mm"
-                )
-            return "Soil moisture data unavailable."
+        return format_soil_moisture(await fetch_agweather(lat, lon))
     except Exception as e:
         print(f"Error fetching soil moisture: {e}")
-        return f"Error fetching soil moisture: {e}"
-
+        return ""
 
 
 async def get_weather_forecast(lat: float, lon: float, days: int = 10):
     try:
-        url = "https://api.weatherbit.io/v2.0/forecast/daily"
-        params = {"lat": lat, "lon": lon, "days": days, "key": WEATHERBIT_KEY}
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            res = await client.get(url, params=params)
-            data = res.json()
-            import json
-            print("===== FULL DAILY WEATHER DATA =====")
-            print(json.dumps(data, indent=2, ensure_ascii=False))
-            print("===== END DATA =====")
-            forecast_summary = []
-            for day in data.get("data", []):
-                date = day.get("datetime")
-                temp = day.get("temp")
-                precip = day.get("precip")
-                rh = day.get("rh")
-                wind = day.get("wind_spd")
-                weather_desc = day.get("weather", {}).get("description", "")
-                irrigation_needed = "Yes" if (precip is not None and precip < 5 and rh is not None and rh < 60) else "No"
-                forecast_summary.append(
-                    f"{date}: Temp={temp}°C, Precip={precip}mm, RH={rh}%, Wind={wind}m/s, "
-                    f"Weather='{weather_desc}', Irrigation Needed={irrigation_needed}"
-                )
-            return "\n".join(forecast_summary) if forecast_summary else "Weather data unavailable."
+        forecast = await fetch_daily_forecast(lat, lon)
+        return format_forecast(forecast[:days])
     except Exception as e:
         print(f"Error fetching daily weather forecast: {e}")
-        return f"Error fetching daily weather forecast: {e}"
+        return ""
 
 
 def extract_city_from_query(query):
@@ -274,97 +172,181 @@ SEED_PROMPTS = [
 ]
 
 
-def get_fewshot_examples(query):
+# Few-shot examples per intent, in the order they are offered
+FEWSHOT_PROMPTS = [
+    ("irrigation", IRRIGATION_PROMPTS),
+    ("weather", WEATHER_PROMPTS),
+    ("cold", WEATHER_PROMPTS),
+    ("schemes", GOVT_PROMPTS),
+    ("market", MARKET_PROMPTS),
+    ("seeds", SEED_PROMPTS),
+]
+
+
+def get_fewshot_examples(plan):
     examples = []
-    if any(word in query.lower() for word in ["irrigation", "irrigate", "water", "schedule", "crop moisture"]):
-        examples += IRRIGATION_PROMPTS
-    if any(word in query.lower() for word in ["frost", "cold", "temperature drop", "weather", "rain", "chill"]):
-        examples += WEATHER_PROMPTS
-    if any(word in query.lower() for word in ["loan", "credit", "subsidy", "insurance", "pmksy", "scheme", "government", "grant"]):
-        examples += GOVT_PROMPTS
-    if any(word in query.lower() for word in ["market", "price", "mandi", "sell", "storage", "profit", "timing"]):
-        examples += MARKET_PROMPTS
-    if any(word in query.lower() for word in ["seed", "variety", "resistance", "tolerant", "hybrid"]):
-        examples += SEED_PROMPTS
+    for intent, prompts in FEWSHOT_PROMPTS:
+        if intent in plan.intents and prompts[0] not in examples:
+            examples += prompts
     return examples[:3]
 
-def safe_context(docs, max_chars=1500):
-    if not docs:
-        return ""
-    text = " ".join([d.page_content for d in docs])
-    return text[:max_chars]
 
-# ================= MARKET PRICE TABLE =================
+def documents_text(docs):
+    return [d.page_content for d in docs or []]
 
-def get_market_price_table(db_path, commodity, district):
-    try:
-        conn = sqlite3.connect(db_path)
-        # 1. Try to get prices for the given district (partial match for commodity)
-        query = """
-            SELECT 
-                "Market Name", 
-                "District Name", 
-                "Min Price(Rs./Quintal)", 
-                "Max Price(Rs./Quintal)", 
-                "Modal Price(Rs./Quintal)", 
-                "Price Date"
-            FROM market_prices
-            WHERE LOWER(Commodity) LIKE ? AND "District Name" LIKE ?
-            ORDER BY "Market Name"
-        """
-        df = pd.read_sql_query(query, conn, params=[f"%{commodity.lower()}%", district])
-        # 2. If not found, try to get prices for the nearby district (if provided)
-        if df.empty and district:
-            query_nearby = """
-                SELECT 
-                    "Market Name", 
-                    "District Name", 
-                    "Min Price(Rs./Quintal)", 
-                    "Max Price(Rs./Quintal)", 
-                    "Modal Price(Rs./Quintal)", 
-                    "Price Date"
-                FROM market_prices
-                WHERE LOWER(Commodity) LIKE ? AND "District Name" LIKE ?
-                ORDER BY "Market Name"
-            """
-            df = pd.read_sql_query(query_nearby, conn, params=[f"%{commodity.lower()}%", district])
-            if not df.empty:
-                conn.close()
-                return (
-                    f"No price data found for district '{district}'. Showing prices for nearby district '{district}':\n\n"
-                    + df.to_markdown(index=False)
-                )
-        # 3. If still not found, show all available prices for the commodity
-        if df.empty:
-            query_all = """
-                SELECT 
-                    "Market Name", 
-                    "District Name", 
-                    "Min Price(Rs./Quintal)", 
-                    "Max Price(Rs./Quintal)", 
-                    "Modal Price(Rs./Quintal)", 
-                    "Price Date"
-                FROM market_prices
-                WHERE LOWER(Commodity) LIKE ?
-                ORDER BY "District Name", "Market Name"
-            """
-            df = pd.read_sql_query(query_all, conn, params=[f"%{commodity.lower()}%"])
-            if not df.empty:
-                conn.close()
-                return (
-                    f"No price data found for district '{district}'. Showing prices from all available regions:\n\n"
-                    + df.to_markdown(index=False)
-                )
-            else:
-                conn.close()
-                return "No price data found for this commodity."
-        conn.close()
-        return df.to_markdown(index=False)
-    except Exception as e:
-        return f"Error: {e}"
+
+# (section the rule depends on, or None for always, rule)
+PROMPT_RULES = [
+    (None, "Only answer the exact question asked. Do not provide extra explanations."),
+    (None, "Keep your answer concise and practical; stay under 100 words unless a table is required. No repetition."),
+    (None, "Only provide market price information if the user explicitly asks for market price."),
+    (None, "For queries related to crop diseases or pesticides, do not return full raw database records. Instead, generate a concise, farmer-friendly summary that highlights only the most relevant disease, pest, or pesticide information from the data."),
+    ("market", "For market prices, give the market name, min price, max price and modal price in separate rows, not in a table."),
+    ("tables", "Figures under Tables are exact dataset values; quote them instead of estimating."),
+    ("weather", "If the irrigation question is asked, explain DAS (days after sowing) in words farmers understand, not just the number."),
+    ("weather", "Give weather forecast information in a structured manner, not the raw details."),
+    ("examples", "For irrigation, weather, schemes and seeds, follow the best-practice examples above."),
+    ("cold", "Use the crop cold tolerance info to assess risk: if the forecast temperature is below the crop's threshold, warn the farmer; if above, reassure them."),
+]
 
 # ================= MAIN ENDPOINT =================
 
+async def resolve_query(query_en, lat, lon):
+    """Embed the query and geocode the farmer at the same time."""
+    geocode_task = asyncio.create_task(with_timeout("geocode", reverse_geocode(lat, lon), dict(EMPTY_LOCATION)))
+    # Embed the query once; every collection is searched with the same vector
+    query_vector = await run_blocking(lambda: get_query_embeddings().embed(query_en))
+    return query_vector, await geocode_task
+
+
+def search_collection(name, query_vector, query_en, k, filter=None):
+    """Runs on the blocking pool, so a store opened on first use doesn't stall the event loop."""
+    if VECTOR_INDEX == "consolidated":
+        return search_collections([name], query_vector, query_en, k, filter)[name]
+    if query_en is None:
+        return search_by_vector(get_store(name), query_vector, k, filter)
+    return hybrid_search(get_store(name), get_bm25(name), query_vector, query_en, k, filter)
+
+
+def search_collections(names, query_vector, query_en, k, filter=None):
+    """{name: docs} from a single ANN query over the consolidated store."""
+    bm25_indexes = {name: get_bm25(name) for name in names if name in BM25_COLLECTIONS}
+    return search_sources(get_consolidated_store(), bm25_indexes, query_vector, query_en, k, names, filter)
+
+
+def table_lookup(query_en, state):
+    """Runs on the blocking pool too: the first call opens the store and builds its vocabulary."""
+    store = get_tabular_store()
+    return store.lookup(query_en, state) if store is not None else ""
+
+
+async def build_prompt(query_en, query_vector, location_info, lat, lon, k, plan):
+    """Gather the context sources the plan asks for and assemble the LLM prompt."""
+    query_lower = query_en.lower()
+    wants_cold = plan.uses("forecast")
+    wants_market = plan.uses("market_db")
+    wants_weather = plan.uses("weather")
+
+    state = location_info.get("state")
+    district = location_info.get("district")
+    city = location_info.get("city")
+
+    commodity = ""
+    if wants_market:
+        matches = re.findall(r"\b(?:of|for)\s+([a-zA-Z ]+)", query_lower)
+        # The commodity dictionary spots names anywhere, so fall back to the whole question
+        commodity_text = matches[-1].strip() if matches else query_en
+        commodity = ", ".join(resolve_commodity(commodity_text)) or commodity_text
+
+    async def cold_docs(crop_name):
+        cold_vector = await run_blocking(lambda: get_query_embeddings().embed(f"{crop_name} cold tolerance"))
+        return await run_blocking(search_collection, "seed_db", cold_vector, None, 2)
+
+    # Exact figures from the indexed tables; the general collection only holds
+    # dumps of the same tables, so it is searched only when no table applies
+    table_context = ""
+    if plan.uses("tables"):
+        table_context = await with_timeout("tables", run_blocking(table_lookup, query_en, state), "")
+
+    collections = {"seeds": "seed_db", "custom": "custom_db", "main": "knowledge_base"}
+    collections = {
+        key: name for key, name in collections.items()
+        if plan.uses(name) and not (key == "main" and table_context)
+    }
+    sources = {}
+    if VECTOR_INDEX == "consolidated" and collections:
+        # One ANN query for every collection instead of one per store
+        sources["retrieval"] = (run_blocking(search_collections, list(collections.values()), query_vector, query_en, k), {})
+    else:
+        for key, name in collections.items():
+            sources[key] = (run_blocking(search_collection, name, query_vector, query_en, k), [])
+    if state and plan.uses("states"):
+        # In-memory paragraphs keyed by canonical state name, not the Chroma state collection
+        sources["state"] = (run_blocking(lambda: get_state_index().search(state, query_en, k)), [])
+    # 🔹 Special case: cold tolerance
+    if wants_cold:
+        crop_match = re.search(r'\b(?:my|the)\s+([a-zA-Z ]+)\s+yield', query_lower)
+        crop_name = crop_match.group(1).strip() if crop_match else None
+        sources["cold_docs"] = (cold_docs(crop_name), [])
+        sources["cold_forecast"] = (fetch_daily_forecast(lat, lon), [])
+    if wants_market:
+        sources["market"] = (run_blocking(get_market_price_table, "agri_market.db", commodity_text, district, lat, lon), (None, ""))
+    if wants_weather:
+        sources["soil"] = (get_soil_moisture(lat, lon), "")
+        sources["weather"] = (get_weather_forecast(lat, lon), "")
+
+    results = await gather_sources(sources)
+    for key, name in collections.items():
+        results.setdefault(key, results.get("retrieval", {}).get(name, []))
+
+    cold_context = []
+    if wants_cold:
+        next_week_min_temp = min_forecast_temp(results["cold_forecast"][:7])
+        if next_week_min_temp is not None:
+            cold_context.append(f"Lowest forecast temperature over the next 7 days: {next_week_min_temp}°C.")
+        cold_context += documents_text(results["cold_docs"])
+
+    # An unavailable API leaves its line out rather than telling the model so
+    weather_context = []
+    if wants_weather and results["soil"]:
+        weather_context.append(f"Soil & Moisture: {results['soil']}")
+    if wants_weather and results["weather"]:
+        weather_context.append(f"Forecast: {results['weather']}")
+
+    # Title the prices by the markets the lookup actually used (district, nearest or all regions)
+    market_scope, market_text = results.get("market", (None, ""))
+    market_title = f"Market Prices ({market_scope} for {commodity})" if market_scope else "Market Prices"
+
+    examples = "\n".join(f"Q: {ex['instruction']}\nA: {ex['output']}" for ex in get_fewshot_examples(plan))
+
+    # Weights: sources asked for explicitly (prices, tables, forecast) beat
+    # general retrieval, which beats the few-shot examples
+    sections = [
+        Section("market", market_title, market_text, 1.2),
+        Section("tables", "Tables", table_context, 1.2),
+        Section("cold", "Crop cold tolerance", cold_context, 1.1),
+        Section("weather", "Weather", weather_context, 1.0),
+        Section("state", f"State ({state})", results.get("state", []), 0.9),
+        Section("main", "General", documents_text(results.get("main")), 0.8),
+        Section("seeds", "Seed", documents_text(results.get("seeds")), 0.8),
+        Section("custom", "Custom", documents_text(results.get("custom")), 0.8),
+        Section("examples", "Q&A examples", examples, 0.5),
+    ]
+    header = (
+        "You are an agriculture assistant for Indian farmers.\n"
+        f"Farmer's Location → State: {state}, District: {district}, City: {city}"
+    )
+    ai_prompt, _ = assemble(query_en, header, sections, PROMPT_RULES, footer=f"Question: {query_en}")
+    return ai_prompt
+
+
+def llm_messages(ai_prompt):
+    return [
+        {"role": "system", "content": "You are a helpful agriculture assistant."},
+        {"role": "user", "content": ai_prompt}
+    ]
+
+
 @app.post("/ask")
 async def ask(
     user_id: str = Form(...),
@@ -376,135 +358,160 @@ async def ask(
     lang: str = Form("en")
 
 ):
-    store_message(user_id, "user", query, chat_id)
+    await store_message(user_id, "user", query, chat_id)
 
     # 1. Translate user query to English if needed
-    if lang != "en":
-        try:
-            query_en = GoogleTranslator(source=lang, target="en").translate(query)
-        except Exception as e:
-            query_en = query  # fallback if translation fails
-    else:
-        query_en = query
+    query_en = await translate(query, lang, "en") if lang != "en" else query
 
-    location_info = await reverse_geocode(lat, lon)
-    state = location_info.get("state")
-    district = location_info.get("district")
-    city = location_info.get("city")
+    query_vector, location_info = await resolve_query(query_en, lat, lon)
+    plan = await run_blocking(lambda: get_intent_router().plan(query_en, query_vector))
+    intent = plan.cache_intent
+    cached = answer_cache.lookup(query_vector, location_info, lang, intent)
+    if cached is not None:
+        await store_message(user_id, "assistant", cached, chat_id)
+        return {"query": query, "location": location_info, "response": cached, "cached": True}
 
-        # 🔹 Special case: cold tolerance
-    if "temperature drop" in query.lower() or "cold" in query.lower():
-        crop_match = re.search(r'\b(?:my|the)\s+([a-zA-Z ]+)\s+yield', query.lower())
-        crop_name = crop_match.group(1).strip() if crop_match else None
+    ai_prompt = await build_prompt(query_en, query_vector, location_info, lat, lon, k, plan)
 
-        retriever_cold = db_seeds.as_retriever(search_kwargs={"k": 2})
-        cold_docs = retriever_cold.get_relevant_documents(f"{crop_name} cold tolerance")
-        cold_context = safe_context(cold_docs, max_chars=1500)
-
-        forecast = await get_weather_forecast(lat, lon, days=7)
-        min_temps = []
-        for line in forecast.split('\n'):
-            match = re.search(r'Temp=([0-9.]+)', line)
-            if match:
-                min_temps.append(float(match.group(1)))
-        next_week_min_temp = min(min_temps) if min_temps else None
-
-   
-    # Market price context
-    market_context = ""
-    commodity = ""
-    if any(w in query_en.lower() for w in ["price", "market", "mandi", "sell"]):
-        matches = re.findall(r"\b(?:of|for)\s+([a-zA-Z ]+)", query_en.lower())
-        commodity = matches[-1].strip() if matches else ""
-        market_context = get_market_price_table("agri_market.db", commodity, district)
-
-    # Few-shot examples
-    examples = get_fewshot_examples(query_en)
-    few_shot_prompt = ""
-    if examples:
-        for ex in examples:
-            few_shot_prompt += f"Q: {ex['instruction']}\nA: {ex['output']}\n"
-
-    # Knowledge context
-    retriever_main = db.as_retriever(search_kwargs={"k": k})
-    retriever_seeds = db_seeds.as_retriever(search_kwargs={"k": k})
-    retriever_custom = db_custom.as_retriever(search_kwargs={"k": k})
-
-    main_context = safe_context(retriever_main.get_relevant_documents(query_en))
-    seed_context = safe_context(retriever_seeds.get_relevant_documents(query_en))
-    custom_context = safe_context(retriever_custom.get_relevant_documents(query_en))
-    state_context = ""
-    if state:
-        retriever_state = db_states.as_retriever(search_kwargs={"k": k, "filter": {"state": state}})
-        state_context = safe_context(retriever_state.get_relevant_documents(query_en))
-
-    # Weather/soil snippet
-    weather_context = ""
-    if any(word in query.lower() for word in ["rain", "weather", "temperature", "forecast", "irrigate", "soil", "moisture"]):
-        soil_moisture = await get_soil_moisture(lat, lon)
-        weather_forecast = await get_weather_forecast(lat, lon)
-        weather_context = f"Soil & Moisture: {soil_moisture}\nForecast: {weather_forecast[:1500]}"
-    prompt_rules = (
-        "Rules:\n"
-        "Only provide market price information if the user explicitly asks for market price. In all other cases, do not include market price details."
-        "if the irrigation question is asked then DAS(days after sowing) should be explained not just DAS should be given it should be easy for the farmers\n"
-        "if you are giving weather forcast information then give in a structured manner not the raw details\n"
-        "- Only answer the exact question asked. Do not provide extra explanations.\n"
-        "- if the user asks for market prices then give details like market name min price max price and modal price in different rows not in a table format\n"
-        "- For irrigation, weather, schemes, seeds, use best-practice examples above.\n"
-        "- Keep your answer concise; stay under 100 words unless a table is required.\n"
-        "- No repetition."
-        " - Use the crop cold tolerance info to assess risk.\n"
-        " - If the forecasted temperature is below the crop's threshold, warn the farmer.\n"
-        " - If above, reassure the farmer.\n"
-        " - Be concise and practical.\n"
-        "For queries related to crop diseases or pesticides, do not return full raw database records. Instead, generate a concise, farmer-friendly summary that highlights only the most relevant disease, pest, or pesticide information from the data."
-    )
+    response = await client.chat.completions.create(model=LLM_MODEL, messages=llm_messages(ai_prompt))
+    ai_content = response.choices[0].message.content
+
+    # 2. Translate answer back to user's language if needed
+    if lang != "en":
+        ai_content = await translate(ai_content, "en", lang)
 
-    ai_prompt = f"""
-    You are an agriculture assistant for Indian farmers.
-    Farmer's Location → State: {state}, District: {district}, City: {city}
+    answer_cache.store(query_vector, location_info, lang, intent, ai_content)
+    await store_message(user_id, "assistant", ai_content,chat_id)
+    return {"query": query, "location": location_info, "response": ai_content}
 
-    Q&A examples:
-    {few_shot_prompt}
 
-    Market Prices (all markets in {district} for {commodity}):
-    {market_context}
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    Context (trimmed DBs):
-    - General: {main_context}
-    - Seed: {seed_context}
-    - State: {state_context}
-    - Custom: {custom_context}
-    - Weather: {weather_context}
 
-    Question: {query_en}
-    
-    {prompt_rules}
-    """
+# Everything up to the last sentence end is ready to be translated
+SENTENCE_END = re.compile(r"[.!?।]\s+|\n+")
 
-    response = client.chat.completions.create(
-        model="llama3-8b-8192",
-        messages=[
-            {"role": "system", "content": "You are a helpful agriculture assistant."},
-            {"role": "user", "content": ai_prompt}
-        ]
-    )
-    ai_content = response.choices[0].message.content
 
-    # 2. Translate answer back to user's language if needed
-    if lang != "en":
+def split_ready(text):
+    ends = [m.end() for m in SENTENCE_END.finditer(text)]
+    if not ends:
+        return "", text
+    return text[:ends[-1]], text[ends[-1]:]
+
+
+@app.post("/ask/stream")
+async def ask_stream(
+    user_id: str = Form(...),
+    chat_id: str = Form(...),
+    query: str = Form(...),
+    lat: float = Form(...),
+    lon: float = Form(...),
+    k: int = Form(3),
+    lang: str = Form("en")
+):
+    """
+    Same as /ask, but streams the answer as Server-Sent Events: one `meta`
+    event, then `token` events as the LLM generates, then `done` with the
+    full answer. Non-English answers are translated sentence by sentence.
+    """
+    await store_message(user_id, "user", query, chat_id)
+    query_en = await translate(query, lang, "en") if lang != "en" else query
+    query_vector, location_info = await resolve_query(query_en, lat, lon)
+    plan = await run_blocking(lambda: get_intent_router().plan(query_en, query_vector))
+    intent = plan.cache_intent
+    cached = answer_cache.lookup(query_vector, location_info, lang, intent)
+
+    async def events():
+        yield sse("meta", {"query": query, "location": location_info, "cached": cached is not None})
+        if cached is not None:
+            await store_message(user_id, "assistant", cached, chat_id)
+            yield sse("token", {"text": cached})
+            yield sse("done", {"response": cached})
+            return
+        pieces = []
+        pending = ""
+        completed = False
         try:
-            ai_content = GoogleTranslator(source="en", target=lang).translate(ai_content)
+            ai_prompt = await build_prompt(query_en, query_vector, location_info, lat, lon, k, plan)
+            stream = await client.chat.completions.create(
+                model=LLM_MODEL, messages=llm_messages(ai_prompt), stream=True
+            )
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if not token:
+                    continue
+                if lang == "en":
+                    pieces.append(token)
+                    yield sse("token", {"text": token})
+                    continue
+                pending += token
+                ready, pending = split_ready(pending)
+                if ready:
+                    text = await translate(ready, "en", lang) + (" " if not ready.endswith("\n") else "\n")
+                    pieces.append(text)
+                    yield sse("token", {"text": text})
+            if pending.strip():
+                text = await translate(pending, "en", lang) if lang != "en" else pending
+                pieces.append(text)
+                yield sse("token", {"text": text})
+            completed = True
+            yield sse("done", {"response": "".join(pieces).strip()})
         except Exception as e:
-            pass  # fallback to English if translation fails
-
-    store_message(user_id, "assistant", ai_content,chat_id)
-    return {"query": query, "location": location_info, "response": ai_content}
+            print(f"Error streaming answer: {e}")
+            yield sse("error", {"detail": "Error fetching response."})
+        finally:
+            # Persist whatever the farmer saw, even if they disconnected mid-stream
+            if pieces:
+                answer = "".join(pieces).strip()
+                await store_message(user_id, "assistant", answer, chat_id)
+                if completed:
+                    answer_cache.store(query_vector, location_info, lang, intent, answer)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/history")
-async def get_history(user_id: str, limit: int = 50):
-    cursor.execute("SELECT role, content, timestamp FROM messages WHERE user_id = ? ORDER BY id ASC LIMIT ?", (user_id, limit))
-    rows = cursor.fetchall()
-    history = [{"role": r[0], "content": r[1], "timestamp": r[2]} for r in rows]
-    return {"history": history}
\ No newline at end of file
+async def get_history(user_id: str, limit: int = Query(50, ge=1, le=MAX_PAGE), after: int = 0):
+    """Oldest messages first; pass the returned next_cursor as `after` for the next page."""
+    rows = await run_blocking(
+        chat_store.fetch_all,
+        "SELECT id, role, content, timestamp FROM messages WHERE user_id = ? AND id > ? ORDER BY id ASC LIMIT ?",
+        (user_id, after, limit),
+    )
+    history = [{"id": r["id"], "role": r["role"], "content": r["content"], "timestamp": r["timestamp"]} for r in rows]
+    return {"history": history, "next_cursor": chat_store.page_cursor(rows, limit)}
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    body = {"ready": is_ready(), "warmup": dict(warmup_report), "loaded": loaded()}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+def resource_stats(name):
+    # /stats runs on the event loop, so it must not build a resource or wait for warmup
+    resource = peek(name)
+    return resource.stats() if resource is not None else None
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "query_embeddings": resource_stats("query_embeddings"),
+        "query_batches": resource_stats("query_batcher"),
+        "geocode_cache": geocode_cache.stats(),
+        "weather_cache": weather_cache.stats(),
+        "translations": translation_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "market_snapshot": current_snapshot().stats() if current_snapshot() else None,
+        "retrieval_modes": dict(retrieval_modes),
+        "chat_writes": chat_store.stats(),
+        "prompt_tokens": prompt_stats.stats(),
+        "intent_router": resource_stats("intent_router"),
+        "state_index": resource_stats("state_index"),
+    }
@@ -0,0 +1,72 @@
+import csv
+import os
+
+import numpy as np
+from geopy.distance import geodesic
+from sklearn.neighbors import BallTree
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# market,district,state,lat,lon per mandi; build it with build_mandi_locations.py
+MANDI_LOCATIONS_PATH = os.getenv("MANDI_LOCATIONS_PATH", os.path.join(BASE_DIR, "data_geo", "mandi_locations.csv"))
+EARTH_RADIUS_KM = 6371.0
+
+
+def normalize_market(name):
+    return " ".join(str(name).lower().split())
+
+
+def place_key(market, district):
+    # Market names repeat across states (Aurangabad, Bilaspur, Hamirpur), so a mandi is its name and district
+    return normalize_market(market), normalize_market(district)
+
+
+class MandiIndex:
+    """BallTree (haversine) over mandi coordinates for nearest-market lookups."""
+
+    def __init__(self, places):
+        self.places = places
+        coords = np.radians([[p["lat"], p["lon"]] for p in places])
+        self.tree = BallTree(coords, metric="haversine")
+
+    @classmethod
+    def load(cls, path=MANDI_LOCATIONS_PATH):
+        if not os.path.exists(path):
+            return None
+        places = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat, lon = float(row["lat"]), float(row["lon"])
+                except (TypeError, ValueError):
+                    continue
+                places.append({"market": row["market"], "district": row["district"], "lat": lat, "lon": lon})
+        return cls(places) if places else None
+
+    def nearest(self, lat, lon, k=5, allowed_markets=None):
+        """
+        The k closest mandis to the farmer, nearest first, as
+        (market, district, km) tuples. `allowed_markets` restricts the result
+        to mandis that actually trade the commodity, given as (market, district)
+        pairs.
+        """
+        allowed = {place_key(m, d) for m, d in allowed_markets} if allowed_markets is not None else None
+        point = np.radians([[lat, lon]])
+        # Widen the search until enough candidates trade the commodity
+        fetch = min(len(self.places), k * 4)
+        while True:
+            _, idx = self.tree.query(point, k=fetch)
+            candidates = [self.places[i] for i in idx[0]]
+            if allowed is not None:
+                candidates = [p for p in candidates if place_key(p["market"], p["district"]) in allowed]
+            if len(candidates) >= k or fetch == len(self.places):
+                break
+            fetch = min(len(self.places), fetch * 4)
+        # BallTree found the candidates; geodesic gives the exact distances for ranking
+        ranked = [
+            (p["market"], p["district"], geodesic((lat, lon), (p["lat"], p["lon"])).km)
+            for p in candidates[:k * 2]
+        ]
+        return sorted(ranked, key=lambda r: r[2])[:k]
+
+
+mandi_index = MandiIndex.load()
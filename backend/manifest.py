@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_manifest.db"))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(collection, source, h, n):
+    """
+    Deterministic document id: the same chunk of the same source always gets
+    the same id, so reruns can tell new chunks from ones already embedded.
+    `n` numbers identical chunks within one source.
+    """
+    return hashlib.sha1(f"{collection}\0{source}\0{h}\0{n}".encode("utf-8")).hexdigest()
+
+
+class SourceDiff:
+    """
+    Streaming diff of one source against the manifest: new_chunks() passes
+    through only chunks that aren't stored yet, and removed() afterwards
+    gives the ids that disappeared. Only ids are held, never the texts.
+    """
+
+    def __init__(self, manifest, collection, source):
+        self.manifest = manifest
+        self.collection = collection
+        self.source = source
+        self.known = {
+            r[0] for r in manifest.conn.execute(
+                "SELECT chunk_id FROM chunks WHERE collection = ? AND source = ?", (collection, source)
+            )
+        }
+        self.seen = set()
+        self._counts = {}
+
+    def add(self, text):
+        """Returns the chunk's id if it still needs embedding, else None."""
+        h = content_hash(text)
+        n = self._counts.get(h, 0)
+        self._counts[h] = n + 1
+        cid = chunk_id(self.collection, self.source, h, n)
+        self.seen.add(cid)
+        if cid in self.known:
+            return None
+        self.manifest.conn.execute(
+            "INSERT OR IGNORE INTO chunks (collection, chunk_id, source, content_hash) VALUES (?, ?, ?, ?)",
+            (self.collection, cid, self.source, h),
+        )
+        return cid
+
+    def new_chunks(self, chunks):
+        """Yields (id, text, metadata) for the (text, metadata) chunks that need embedding."""
+        for text, metadata in chunks:
+            cid = self.add(text)
+            if cid is not None:
+                yield cid, text, metadata
+
+    def removed(self):
+        gone = sorted(self.known - self.seen)
+        if gone:
+            self.manifest.conn.executemany(
+                "DELETE FROM chunks WHERE collection = ? AND chunk_id = ?", [(self.collection, cid) for cid in gone]
+            )
+        return gone
+
+
+class IngestManifest:
+    """
+    Per-file and per-chunk content hashes for everything written to Chroma.
+    Changes are staged in one SQLite transaction; call commit() only after
+    the matching Chroma writes have been flushed.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            collection TEXT NOT NULL,
+            source TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            size INTEGER,
+            mtime REAL,
+            sha256 TEXT,
+            PRIMARY KEY (collection, source)
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            collection TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            source TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            PRIMARY KEY (collection, chunk_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(collection, source);
+        """)
+        self.conn.commit()
+
+    def file_unchanged(self, collection, source, path):
+        """True if `path` matches what was last ingested for this source."""
+        row = self.conn.execute(
+            "SELECT size, mtime, sha256 FROM files WHERE collection = ? AND source = ?", (collection, source)
+        ).fetchone()
+        if row is None:
+            return False
+        stat = os.stat(path)
+        if row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return True
+        # Touched but maybe not changed: fall back to the content hash
+        if row[0] == stat.st_size and row[2] == file_hash(path):
+            self.conn.execute(
+                "UPDATE files SET mtime = ? WHERE collection = ? AND source = ?", (stat.st_mtime, collection, source)
+            )
+            return True
+        return False
+
+    def record_file(self, collection, source, scope, path=None):
+        size = mtime = sha = None
+        if path is not None:
+            stat = os.stat(path)
+            size, mtime, sha = stat.st_size, stat.st_mtime, file_hash(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (collection, source, scope, size, mtime, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+            (collection, source, scope, size, mtime, sha),
+        )
+
+    def chunk_sources(self, collection):
+        """chunk id -> the file or table:date source it was cut from."""
+        return dict(self.conn.execute("SELECT chunk_id, source FROM chunks WHERE collection = ?", (collection,)))
+
+    def source_diff(self, collection, source):
+        return SourceDiff(self, collection, source)
+
+    def prune(self, collection, scope, present_sources):
+        """Forget sources in `scope` that no longer exist; returns their chunk ids."""
+        rows = self.conn.execute(
+            "SELECT source FROM files WHERE collection = ? AND scope = ?", (collection, scope)
+        ).fetchall()
+        gone = [r[0] for r in rows if r[0] not in set(present_sources)]
+        ids = []
+        for source in gone:
+            ids += [r[0] for r in self.conn.execute(
+                "SELECT chunk_id FROM chunks WHERE collection = ? AND source = ?", (collection, source)
+            )]
+            self.conn.execute("DELETE FROM chunks WHERE collection = ? AND source = ?", (collection, source))
+            self.conn.execute("DELETE FROM files WHERE collection = ? AND source = ?", (collection, source))
+        return ids
+
+    def reset(self, collection=None):
+        if collection is None:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM files")
+        else:
+            self.conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,))
+            self.conn.execute("DELETE FROM files WHERE collection = ?", (collection,))
+        self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from commodities import resolve_commodity
+from mandi_index import mandi_index
+from market_snapshot import current_snapshot, normalize_district
+from market_summary import summarize_prices
+
+PRICE_COLUMNS = """
+    "Commodity",
+    "Market Name",
+    "District Name",
+    "Min Price(Rs./Quintal)",
+    "Max Price(Rs./Quintal)",
+    "Modal Price(Rs./Quintal)",
+    "Price Date"
+"""
+# How many nearby mandis to show when the farmer's district has no prices
+NEARBY_MARKETS = int(os.getenv("NEARBY_MARKETS", "5"))
+# District names only change when the scraper adds new mandis
+DISTRICT_NAMES_TTL = 3600
+
+_district_names = {}
+
+
+def ensure_market_indexes(conn):
+    # Same indexes the agrimarket scrapers create; cheap no-ops once they exist
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_commodity ON market_prices("Commodity")')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_district ON market_prices("District Name")')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_commodity_district ON market_prices("Commodity", "District Name")')
+
+
+def resolve_district(conn, db_path, district):
+    """Map a geocoder district ("Pune District") to the exact market_prices value."""
+    if not district:
+        return None
+    cached = _district_names.get(db_path)
+    if cached is None or time.time() - cached[0] > DISTRICT_NAMES_TTL:
+        rows = conn.execute('SELECT DISTINCT "District Name" FROM market_prices').fetchall()
+        cached = (time.time(), {normalize_district(r[0]): r[0] for r in rows if r[0]})
+        _district_names[db_path] = cached
+    return cached[1].get(normalize_district(district))
+
+
+# Where the listed markets are, for the prompt's section title. Each price
+# lookup below returns (scope, text); scope is None when there is no data
+NO_PRICE_DATA = (None, "No price data found for this commodity.")
+
+
+def district_prices(district, df):
+    return f"markets in {district}", summarize_prices(df)
+
+
+def nearby_prices(district, nearest, df):
+    """Price summary for the nearest mandis, ordered by distance from the farmer."""
+    distance = {(market, district): km for market, district, km in nearest}
+    return "nearest markets", (
+        f"No price data found for district '{district}'. Showing prices from the nearest markets:\n\n"
+        + summarize_prices(df, distance)
+    )
+
+
+def all_regions_prices(district, df):
+    return "most active markets in all regions", (
+        f"No price data found for district '{district}'. Showing the most active markets in all regions:\n\n"
+        + summarize_prices(df)
+    )
+
+
+def snapshot_price_table(snapshot, commodities, district, lat=None, lon=None):
+    """Same output as the SQL path, served from the in-memory snapshot."""
+    district_code = snapshot.district_code(district)
+    if district_code is not None:
+        rows = snapshot.lookup(commodities, district_code)
+        if len(rows):
+            return district_prices(district, snapshot.frame(rows))
+    if mandi_index is not None and lat is not None and lon is not None:
+        nearest = mandi_index.nearest(lat, lon, NEARBY_MARKETS, snapshot.markets_trading(commodities))
+        if nearest:
+            rows = snapshot.in_markets(snapshot.lookup(commodities), [(m, d) for m, d, _ in nearest])
+            return nearby_prices(district, nearest, snapshot.frame(rows))
+    rows = snapshot.lookup(commodities)
+    if not len(rows):
+        return NO_PRICE_DATA
+    return all_regions_prices(district, snapshot.frame(rows))
+
+
+def get_market_price_table(db_path, commodity, district, lat=None, lon=None):
+    """(scope, summary text) for the commodity's prices around `district`."""
+    try:
+        commodities = resolve_commodity(commodity)
+        if not commodities:
+            return NO_PRICE_DATA
+        snapshot = current_snapshot()
+        if snapshot is not None:
+            return snapshot_price_table(snapshot, commodities, district, lat, lon)
+        conn = sqlite3.connect(db_path)
+        ensure_market_indexes(conn)
+        in_clause = ", ".join("?" * len(commodities))
+        district_name = resolve_district(conn, db_path, district)
+        # 1. Try to get prices for the given district (indexed equality on both columns)
+        df = pd.DataFrame()
+        if district_name:
+            query = f"""
+                SELECT {PRICE_COLUMNS}
+                FROM market_prices
+                WHERE Commodity IN ({in_clause}) AND "District Name" = ?
+            """
+            df = pd.read_sql_query(query, conn, params=[*commodities, district_name])
+        # 2. If not found, use the nearest mandis that trade this commodity
+        if df.empty and mandi_index is not None and lat is not None and lon is not None:
+            traded = conn.execute(
+                f'SELECT DISTINCT "Market Name", "District Name" FROM market_prices WHERE Commodity IN ({in_clause})',
+                commodities,
+            ).fetchall()
+            nearest = mandi_index.nearest(lat, lon, NEARBY_MARKETS, traded)
+            if nearest:
+                # Match name and district: same-named mandis in other states are not nearby
+                places = ", ".join("(?, ?)" for _ in nearest)
+                query_nearby = f"""
+                    SELECT {PRICE_COLUMNS}
+                    FROM market_prices
+                    WHERE Commodity IN ({in_clause}) AND ("Market Name", "District Name") IN (VALUES {places})
+                """
+                params = [*commodities, *(name for m, d, _ in nearest for name in (m, d))]
+                df = pd.read_sql_query(query_nearby, conn, params=params)
+                conn.close()
+                return nearby_prices(district, nearest, df)
+        # 3. Without mandi coordinates, summarize the most active markets anywhere
+        if df.empty:
+            query_all = f"""
+                SELECT {PRICE_COLUMNS}
+                FROM market_prices
+                WHERE Commodity IN ({in_clause})
+            """
+            df = pd.read_sql_query(query_all, conn, params=list(commodities))
+            if not df.empty:
+                conn.close()
+                return all_regions_prices(district, df)
+            else:
+                conn.close()
+                return NO_PRICE_DATA
+        conn.close()
+        return district_prices(district_name, df)
+    except Exception as e:
+        return None, f"Error: {e}"
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from concurrency import run_blocking
+
+MARKET_DB_PATH = os.getenv("MARKET_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agri_market.db"))
+# How often to check whether the daily scrape has rewritten the database
+MARKET_SNAPSHOT_POLL = float(os.getenv("MARKET_SNAPSHOT_POLL", "60"))
+
+MIN_PRICE = "Min Price(Rs./Quintal)"
+MAX_PRICE = "Max Price(Rs./Quintal)"
+MODAL_PRICE = "Modal Price(Rs./Quintal)"
+
+
+def normalize_district(name):
+    name = re.sub(r"\s+", " ", (name or "").lower()).strip()
+    return re.sub(r" (district|dist\.?)$", "", name)
+
+
+class MarketSnapshot:
+    """
+    Columnar, read-only copy of market_prices. Commodity, district and market
+    are categorical codes, prices and dates are NumPy arrays, and rows are
+    sorted by commodity so each commodity is one contiguous slice.
+    """
+
+    def __init__(self, frame, source_mtime=None):
+        commodity = pd.Categorical(frame["Commodity"])
+        district = pd.Categorical(frame["District Name"])
+        market = pd.Categorical(frame["Market Name"])
+        dates = pd.to_datetime(frame["Price Date"], format="%d %b %Y", errors="coerce").values.astype("datetime64[D]")
+        order = np.lexsort((dates, market.codes, district.codes, commodity.codes))
+
+        self.commodities = list(commodity.categories)
+        self.districts = list(district.categories)
+        self.markets = list(market.categories)
+        self.commodity_codes = commodity.codes[order]
+        self.district_codes = district.codes[order]
+        self.market_codes = market.codes[order]
+        self.dates = dates[order]
+        self.min_price = pd.to_numeric(frame[MIN_PRICE], errors="coerce").to_numpy(dtype=np.float64)[order]
+        self.max_price = pd.to_numeric(frame[MAX_PRICE], errors="coerce").to_numpy(dtype=np.float64)[order]
+        self.modal_price = pd.to_numeric(frame[MODAL_PRICE], errors="coerce").to_numpy(dtype=np.float64)[order]
+        # offsets[c]:offsets[c + 1] is the slice for commodity code c
+        self.offsets = np.searchsorted(self.commodity_codes, np.arange(len(self.commodities) + 1))
+        self.commodity_index = {name: i for i, name in enumerate(self.commodities)}
+        self.district_index = {normalize_district(name): i for i, name in enumerate(self.districts)}
+        self.source_mtime = source_mtime
+        self.loaded_at = time.time()
+        self.rows = len(order)
+
+    @classmethod
+    def load(cls, db_path=MARKET_DB_PATH):
+        mtime = os.path.getmtime(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            frame = pd.read_sql_query(
+                f'SELECT "Commodity", "District Name", "Market Name", "{MIN_PRICE}", "{MAX_PRICE}", '
+                f'"{MODAL_PRICE}", "Price Date" FROM market_prices',
+                conn,
+            )
+        finally:
+            conn.close()
+        return cls(frame, source_mtime=mtime)
+
+    def district_code(self, district):
+        return self.district_index.get(normalize_district(district)) if district else None
+
+    def lookup(self, commodities, district_code=None):
+        """Row positions for the given commodity names, optionally within one district."""
+        slices = []
+        for name in commodities:
+            code = self.commodity_index.get(name)
+            if code is None:
+                continue
+            rows = np.arange(self.offsets[code], self.offsets[code + 1])
+            if district_code is not None:
+                rows = rows[self.district_codes[rows] == district_code]
+            slices.append(rows)
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def markets_trading(self, commodities):
+        """(market, district) pairs with prices for the commodities."""
+        rows = self.lookup(commodities)
+        pairs = set(zip(self.market_codes[rows].tolist(), self.district_codes[rows].tolist()))
+        return [(self.markets[m], self.districts[d]) for m, d in sorted(pairs)]
+
+    def in_markets(self, rows, places):
+        """The rows from the given (market, district) pairs, not from same-named markets elsewhere."""
+        market_codes = {name: i for i, name in enumerate(self.markets)}
+        district_codes = {name: i for i, name in enumerate(self.districts)}
+        n = len(self.districts)
+        wanted = [
+            market_codes[market] * n + district_codes[district]
+            for market, district in places if market in market_codes and district in district_codes
+        ]
+        pair_codes = self.market_codes[rows].astype(np.int64) * n + self.district_codes[rows]
+        return rows[np.isin(pair_codes, wanted)]
+
+    def frame(self, rows):
+        """Rows as a DataFrame with the same columns as the SQL lookup."""
+        return pd.DataFrame({
+            "Commodity": np.asarray(self.commodities, dtype=object)[self.commodity_codes[rows]],
+            "Market Name": np.asarray(self.markets, dtype=object)[self.market_codes[rows]],
+            "District Name": np.asarray(self.districts, dtype=object)[self.district_codes[rows]],
+            MIN_PRICE: self.min_price[rows],
+            MAX_PRICE: self.max_price[rows],
+            MODAL_PRICE: self.modal_price[rows],
+            "Price Date": pd.to_datetime(self.dates[rows]).strftime("%d %b %Y"),
+        })
+
+    def stats(self):
+        return {
+            "rows": self.rows,
+            "commodities": len(self.commodities),
+            "districts": len(self.districts),
+            "markets": len(self.markets),
+            "loaded_at": self.loaded_at,
+        }
+
+
+_snapshot = None
+
+
+def current_snapshot():
+    return _snapshot
+
+
+def reload_snapshot(db_path=MARKET_DB_PATH):
+    """Build a new snapshot and swap it in; readers keep whichever one they already hold."""
+    global _snapshot
+    if not os.path.exists(db_path):
+        print(f"Market database not found at {db_path}, price lookups will use SQLite")
+        return None
+    start = time.perf_counter()
+    try:
+        snapshot = MarketSnapshot.load(db_path)
+    except Exception as e:
+        print(f"Error loading market snapshot: {e}")
+        return None
+    _snapshot = snapshot
+    print(f"Loaded market snapshot: {snapshot.rows} rows in {time.perf_counter() - start:.2f}s")
+    return snapshot
+
+
+async def watch_market_db(db_path=MARKET_DB_PATH, interval=MARKET_SNAPSHOT_POLL):
+    """
+    Reload the snapshot after the daily scrape finishes. The scrape writes in
+    many steps, so only reload once the file's mtime has stopped changing.
+    """
+    last_seen = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = os.path.getmtime(db_path)
+        except OSError:
+            continue
+        loaded = _snapshot.source_mtime if _snapshot else None
+        if mtime != loaded and mtime == last_seen:
+            await run_blocking(reload_snapshot, db_path)
+        last_seen = mtime
@@ -0,0 +1,97 @@
+"""
+Compact market-price context for the prompt. Instead of every scraped row,
+each market gets one line: its latest min/max/modal price and how the
+modal price moved over the scrape window (45 days). Only the nearest or
+most active markets are listed, under a hard row and token cap.
+"""
+import os
+
+import pandas as pd
+
+from market_snapshot import MAX_PRICE, MIN_PRICE, MODAL_PRICE
+from prompt_builder import count_tokens
+
+MARKET_SUMMARY_ROWS = int(os.getenv("MARKET_SUMMARY_ROWS", "8"))
+MARKET_SUMMARY_TOKENS = int(os.getenv("MARKET_SUMMARY_TOKENS", "400"))
+# Modal price changes smaller than this (percent) are reported as steady
+TREND_STEADY_PCT = 2.0
+
+
+def market_latest(df):
+    """
+    One row per (commodity, market, district): the latest prices plus the first modal
+    price in the window, the number of price days and the trend in percent.
+    """
+    df = df.assign(
+        _date=pd.to_datetime(df["Price Date"], format="%d %b %Y", errors="coerce"),
+        **{col: pd.to_numeric(df[col], errors="coerce") for col in (MIN_PRICE, MAX_PRICE, MODAL_PRICE)},
+    ).dropna(subset=["_date", MODAL_PRICE])
+    # Same-named markets in different districts are different mandis
+    keys = ["Market Name", "District Name"]
+    if "Commodity" in df.columns:
+        keys.insert(0, "Commodity")
+    groups = df.sort_values("_date", kind="stable").groupby(keys, sort=False)
+    latest = groups.tail(1).set_index(keys)
+    first = groups.head(1).set_index(keys)
+    latest["first_date"] = first["_date"]
+    latest["first_modal"] = first[MODAL_PRICE]
+    latest["days"] = groups.size()
+    latest["trend"] = (latest[MODAL_PRICE] / latest["first_modal"] - 1) * 100
+    return latest.reset_index()
+
+
+def _trend_text(row):
+    if row["days"] < 2 or pd.isna(row["trend"]):
+        return "single report"
+    since = row["first_date"].strftime("%d %b")
+    if abs(row["trend"]) < TREND_STEADY_PCT:
+        return f"steady since {since}"
+    return f"{'up' if row['trend'] > 0 else 'down'} {abs(row['trend']):.0f}% since {since}"
+
+
+def _line(row, distance, show_commodity):
+    place = f"{row['Market Name']} ({row['District Name']})"
+    if distance is not None and pd.notna(row.get("distance")):
+        place += f", {row['distance']:.0f} km"
+    commodity = f" {row['Commodity']}" if show_commodity else ""
+    # Some reports only carry the modal price; leave out what is missing
+    prices = [f"{label} ₹{row[col]:.0f}" for label, col in (("min", MIN_PRICE), ("max", MAX_PRICE)) if pd.notna(row[col])]
+    prices.append(f"modal ₹{row[MODAL_PRICE]:.0f}/quintal")
+    return f"- {place}:{commodity} on {row['_date'].strftime('%d %b %Y')} {', '.join(prices)}; {_trend_text(row)}"
+
+
+def summarize_prices(df, distance=None, max_rows=MARKET_SUMMARY_ROWS, max_tokens=MARKET_SUMMARY_TOKENS):
+    """
+    Summary lines for the price rows in `df`. With `distance` ((market,
+    district) -> km) the nearest markets come first; otherwise the most
+    recently and most often reported ones.
+    """
+    latest = market_latest(df)
+    if latest.empty:
+        return "No price data found for this commodity."
+    if distance is not None:
+        latest["distance"] = [
+            distance.get(place, float("nan")) for place in zip(latest["Market Name"], latest["District Name"])
+        ]
+        latest = latest.sort_values(["distance", "Market Name"], kind="stable", na_position="last")
+    else:
+        latest = latest.sort_values(["_date", "days", "Market Name"], ascending=[False, False, True], kind="stable")
+
+    # Several commodities match names like "onion"; say which one each line is
+    show_commodity = "Commodity" in latest.columns and latest["Commodity"].nunique() > 1
+    modal = latest[MODAL_PRICE]
+    lines = [
+        f"{len(latest)} market{'s' if len(latest) != 1 else ''} reporting; latest modal prices range ₹{modal.min():.0f}–₹{modal.max():.0f} "
+        f"(median ₹{modal.median():.0f}) per quintal."
+    ]
+    used = count_tokens(lines[0])
+    for _, row in latest.head(max_rows).iterrows():
+        line = _line(row, distance, show_commodity)
+        used += count_tokens(line) + 1
+        if used > max_tokens:
+            break
+        lines.append(line)
+    hidden = len(latest) - (len(lines) - 1)
+    if hidden:
+        lines.append(f"({hidden} more markets not shown)")
+    return "\n".join(lines)
@@ -0,0 +1,176 @@
+"""
+Token-budgeted assembly of the /ask prompt.
+
+Each context source becomes a Section with a base weight. Sections are
+scored by how many of the question's keywords they contain, and the
+context budget is shared out in proportion to score: a section that needs
+less than its share gives the rest back to the others. Text is cut at
+sentence or line ends, never mid-sentence; sentences already used by a
+higher-scored section (overlapping chunks from different collections) are
+skipped; empty sections and their rules are left out entirely.
+"""
+import hashlib
+import os
+import re
+from collections import Counter
+
+from bm25 import tokenize
+
+# Tokens for all context sections together; the fixed header, question and rules come on top
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+# Sections that would get less than this are dropped rather than cut to a fragment
+MIN_SECTION_TOKENS = int(os.getenv("MIN_SECTION_TOKENS", "40"))
+# Llama 3's tokenizer averages about four characters per token on English text
+CHARS_PER_TOKEN = 4
+# Share of the score every non-empty section gets before keyword overlap counts
+BASE_RELEVANCE = 0.25
+
+# A sentence with its trailing whitespace, or a single line (table rows, lists).
+# A period only ends a sentence before whitespace, so "3.5 t/ha" stays whole
+_SENTENCE = re.compile(r"\S.*?(?:[.!?।](?=\s|$)|\n|$)\s*", re.S)
+_WORD = re.compile(r"\w+")
+# Shorter pieces (table headers and separators) may legitimately repeat
+_MIN_DEDUPE_WORDS = 5
+
+
+def count_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def split_sentences(text):
+    return _SENTENCE.findall(text)
+
+
+def _fingerprint(sentence):
+    return hashlib.sha1(" ".join(sentence.lower().split()).encode("utf-8")).digest()
+
+
+class Section:
+    def __init__(self, name, title, chunks, weight=1.0):
+        """`chunks` is a string or a list of strings (retrieved documents, best first)."""
+        self.name = name
+        self.title = title
+        self.chunks = [chunks] if isinstance(chunks, str) else [c for c in chunks if c]
+        self.weight = weight
+        self.text = ""
+
+    def sentences(self, seen):
+        for chunk in self.chunks:
+            for sentence in split_sentences(chunk.strip() + "\n"):
+                if len(_WORD.findall(sentence)) >= _MIN_DEDUPE_WORDS:
+                    key = _fingerprint(sentence)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                yield sentence
+
+    def relevance(self, query_terms):
+        if not query_terms:
+            return self.weight
+        terms = set(tokenize(" ".join(self.chunks)))
+        coverage = sum(1 for t in query_terms if t in terms) / len(query_terms)
+        return self.weight * (BASE_RELEVANCE + coverage)
+
+
+def _allocate(needs, scores, budget):
+    """Split `budget` by score, handing what a section doesn't need to the rest."""
+    allocation = {}
+    pending = set(needs)
+    while pending:
+        total = sum(scores[name] for name in pending)
+        share = {name: budget * scores[name] / total for name in pending}
+        satisfied = [name for name in pending if needs[name] <= share[name]]
+        if not satisfied:
+            allocation.update({name: int(share[name]) for name in pending})
+            break
+        for name in satisfied:
+            allocation[name] = needs[name]
+            budget -= needs[name]
+            pending.discard(name)
+    return allocation
+
+
+def _fit(sentences, max_tokens):
+    out, used = [], 0
+    for sentence in sentences:
+        cost = count_tokens(sentence)
+        if used + cost > max_tokens:
+            break
+        out.append(sentence)
+        used += cost
+    if not out and sentences:
+        # One run-on sentence longer than the whole share: cut it at a word boundary
+        head = sentences[0][:max_tokens * CHARS_PER_TOKEN - 1]
+        return head.rsplit(" ", 1)[0].rstrip() + "…"
+    return "".join(out).strip()
+
+
+class PromptStats:
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.max_tokens = 0
+        self.dropped = Counter()
+
+    def record(self, tokens, dropped):
+        self.requests += 1
+        self.tokens += tokens
+        self.max_tokens = max(self.max_tokens, tokens)
+        self.dropped.update(dropped)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "avg_tokens": round(self.tokens / self.requests) if self.requests else 0,
+            "max_tokens": self.max_tokens,
+            "dropped_sections": dict(self.dropped),
+        }
+
+
+prompt_stats = PromptStats()
+
+
+def assemble(query, header, sections, rules, footer="", budget=PROMPT_TOKEN_BUDGET):
+    """
+    Build the prompt from `header`, the sections that earn a share of
+    `budget`, `footer` (the question) and the rules whose section made it
+    in. `rules` is a list of (section name or None for always, text).
+    Returns the prompt and a per-section token report.
+    """
+    query_terms = sorted(set(tokenize(query)))
+    candidates = [s for s in sections if s.chunks]
+    scores = {s.name: s.relevance(query_terms) for s in candidates}
+
+    # Dedupe in score order so an overlapping chunk stays in its most relevant section
+    seen = set()
+    sentences = {}
+    for section in sorted(candidates, key=lambda s: scores[s.name], reverse=True):
+        sentences[section.name] = list(section.sentences(seen))
+    needs = {name: sum(count_tokens(s) for s in found) for name, found in sentences.items() if found}
+    allocation = _allocate(needs, scores, budget)
+
+    kept = []
+    for section in candidates:
+        tokens = allocation.get(section.name, 0)
+        if tokens == 0 or tokens < min(MIN_SECTION_TOKENS, needs[section.name]):
+            continue
+        section.text = _fit(sentences[section.name], tokens)
+        if section.text:
+            kept.append(section)
+    kept_names = {s.name for s in kept}
+
+    parts = [header.strip()]
+    parts += [f"{s.title}:\n{s.text}" for s in kept]
+    if footer:
+        parts.append(footer.strip())
+    active_rules = [text for requires, text in rules if requires is None or requires in kept_names]
+    if active_rules:
+        parts.append("Rules:\n" + "\n".join(f"- {text}" for text in active_rules))
+    prompt = "\n\n".join(parts)
+
+    report = {s.name: count_tokens(s.text) for s in kept}
+    report["total"] = count_tokens(prompt)
+    dropped = [s.name for s in sections if s.name not in kept_names]
+    prompt_stats.record(report["total"], dropped)
+    print(f"Prompt tokens: {report} (budget {budget}, dropped {dropped or 'none'})")
+    return prompt, report
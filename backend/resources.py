@@ -0,0 +1,149 @@
+"""
+Heavy shared resources (embedding model, Chroma stores, BM25 indexes,
+the tabular store),
+created on first use instead of at import. The API builds them all in
+warmup() right after startup; ingestion scripts only build what they
+touch.
+"""
+import os
+import threading
+import time
+
+from bm25 import load_index
+from embedding_backends import BatchingEmbedder, create_embedding_model
+from embeddings import QueryEmbeddingCache
+from intent_router import IntentRouter
+from state_index import StateIndex
+from tabular import TabularStore
+
+STORE_DIRS = {
+    "knowledge_base": "./chroma_db",
+    "seed_db": "./chroma_seeds",
+    "state_db": "./chroma_states",
+    "custom_db": "./chroma_custom",
+}
+BM25_COLLECTIONS = ("knowledge_base", "seed_db", "custom_db")
+# "separate": one Chroma store per source. "consolidated": a single store
+# holding every source, tagged with `source` metadata; build it with
+# consolidate_index.py
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "separate")
+CONSOLIDATED_DIR = os.getenv("CONSOLIDATED_DIR", "./chroma_all")
+CONSOLIDATED_COLLECTION = "agrisense"
+
+_resources = {}
+# Reentrant: building the query cache builds the model under the same lock
+_lock = threading.RLock()
+warmup_report = {}
+
+
+def _get(name, factory):
+    resource = _resources.get(name)
+    if resource is not None:
+        return resource
+    with _lock:
+        resource = _resources.get(name)
+        if resource is None:
+            resource = factory()
+            # None means not built yet (BM25 index, tabular store): try again
+            # next time so a later ingest is picked up without a restart
+            if resource is not None:
+                _resources[name] = resource
+        return resource
+
+
+def get_embedding_model():
+    return _get("embedding_model", create_embedding_model)
+
+
+def get_query_batcher():
+    # Concurrent /ask requests share one forward pass for their query vectors
+    return _get("query_batcher", lambda: BatchingEmbedder(get_embedding_model()))
+
+
+def get_query_embeddings():
+    return _get("query_embeddings", lambda: QueryEmbeddingCache(get_query_batcher()))
+
+
+def get_intent_router():
+    return _get("intent_router", lambda: IntentRouter(get_embedding_model()))
+
+
+def _open_chroma(collection_name, directory):
+    from langchain.vectorstores import Chroma
+
+    return Chroma(collection_name=collection_name, embedding_function=get_embedding_model(),
+                  persist_directory=directory)
+
+
+def get_store(name):
+    return _get(f"store:{name}", lambda: _open_chroma(name, STORE_DIRS[name]))
+
+
+def get_consolidated_store():
+    return _get("store:consolidated", lambda: _open_chroma(CONSOLIDATED_COLLECTION, CONSOLIDATED_DIR))
+
+
+def get_stores():
+    return {name: get_store(name) for name in STORE_DIRS}
+
+
+def searched_stores():
+    if VECTOR_INDEX == "consolidated":
+        return [get_consolidated_store()]
+    return [get_store(name) for name in BM25_COLLECTIONS]
+
+
+def get_bm25(name):
+    """Lexical index written by ingest.py next to the collection (None until built)."""
+    return _get(f"bm25:{name}", lambda: load_index(name))
+
+
+def get_state_index():
+    return _get("state_index", StateIndex.load)
+
+
+def get_tabular_store():
+    """Indexed SQLite copy of data_csv built by ingest.py (None until built)."""
+    return _get("tabular_store", TabularStore.open)
+
+
+def peek(name):
+    """The resource if it is already built; never builds it or waits for the lock."""
+    return _resources.get(name)
+
+
+def loaded():
+    return sorted(_resources)
+
+
+def is_ready():
+    return bool(warmup_report) and "error" not in warmup_report
+
+
+def warmup():
+    """
+    Build every resource the API needs and run one query through the model
+    so the first farmer doesn't pay for it. Records seconds per step.
+    """
+    steps = [
+        ("embedding_model", lambda: get_query_embeddings().embed("warmup")),
+        # state_db is only written by ingest; requests read state_index instead
+        ("stores", lambda: [store._collection.count() for store in searched_stores()]),
+        ("bm25", lambda: [get_bm25(name) for name in BM25_COLLECTIONS]),
+        ("state_index", get_state_index),
+        ("tabular_store", get_tabular_store),
+        ("intent_router", lambda: get_intent_router().embedding_intents(get_query_embeddings().embed("warmup"))),
+    ]
+    report = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warmup step {name} failed: {e}")
+            report["error"] = f"{name}: {e}"
+            break
+        report[name] = round(time.perf_counter() - start, 3)
+    warmup_report.clear()
+    warmup_report.update(report)
+    return report
@@ -0,0 +1,125 @@
+"""
+In-memory index of the per-state knowledge files (data_states/*.txt).
+
+The files are named by hand ("gujrat", "himachla pradesh", "mizorem"), so
+both the file names and the geocoder's state names are mapped to one
+canonical spelling through an alias table, with a fuzzy match for new
+typos. Each state's text is split into paragraph chunks once at load, and
+a question is answered from the state's own BM25 index: no embedding, no
+Chroma round trip. States without a file fall back to the central
+(nationwide) schemes.
+"""
+import difflib
+import glob
+import os
+import re
+
+from bm25 import BM25Index
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATES_DIR = os.getenv("STATES_DIR", os.path.join(BASE_DIR, "data_states"))
+STATE_CHUNK_CHARS = int(os.getenv("STATE_CHUNK_CHARS", "1200"))
+
+CENTRAL = "Central"
+INDIAN_STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana",
+    "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
+    "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana",
+    "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal",
+    "Andaman and Nicobar Islands", "Chandigarh", "Dadra and Nagar Haveli and Daman and Diu", "Delhi",
+    "Jammu and Kashmir", "Ladakh", "Lakshadweep", "Puducherry",
+]
+STATE_ALIASES = {
+    "gujrat": "Gujarat",
+    "himachla pradesh": "Himachal Pradesh",
+    "mizorem": "Mizoram",
+    "tamilnadu": "Tamil Nadu",
+    "jammu kashmir": "Jammu and Kashmir",
+    "orissa": "Odisha",
+    "uttaranchal": "Uttarakhand",
+    "pondicherry": "Puducherry",
+    "nct of delhi": "Delhi",
+    "national capital territory of delhi": "Delhi",
+    "central": CENTRAL,
+}
+# Leftovers from scraping the state pages
+JUNK_LINE = re.compile(r"adsbygoogle|^\s*\(?\s*function\s*\(")
+
+
+def normalize_state(name):
+    name = re.sub(r"[^a-z ]+", " ", (name or "").lower().replace("&", " and "))
+    name = " ".join(name.split())
+    return re.sub(r"^state of | state$", "", name)
+
+
+_CANONICAL = {normalize_state(name): name for name in INDIAN_STATES}
+_CANONICAL.update(STATE_ALIASES)
+
+
+def canonical_state(name):
+    """'gujrat', 'GUJARAT', 'Gujarat State' -> 'Gujarat'; None if nothing is close."""
+    key = normalize_state(name)
+    if not key:
+        return None
+    if key in _CANONICAL:
+        return _CANONICAL[key]
+    close = difflib.get_close_matches(key, list(_CANONICAL), n=1, cutoff=0.85)
+    return _CANONICAL[close[0]] if close else None
+
+
+def split_paragraphs(text, max_chars=STATE_CHUNK_CHARS):
+    """Paragraph chunks of up to max_chars; consecutive short paragraphs are merged."""
+    chunk = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        lines = [line.strip() for line in paragraph.splitlines() if line.strip() and not JUNK_LINE.search(line)]
+        if not lines:
+            continue
+        paragraph = "\n".join(lines)
+        if chunk and len(chunk) + len(paragraph) > max_chars:
+            yield chunk
+            chunk = ""
+        while len(paragraph) > max_chars:
+            # Cut an oversized paragraph at the last sentence end before the limit
+            cut = paragraph.rfind(". ", 0, max_chars) + 1 or max_chars
+            yield paragraph[:cut].strip()
+            paragraph = paragraph[cut:].strip()
+        chunk = f"{chunk}\n\n{paragraph}" if chunk else paragraph
+    if chunk:
+        yield chunk
+
+
+class StateIndex:
+    def __init__(self):
+        self.chunks = {}
+        self.indexes = {}
+
+    @classmethod
+    def load(cls, folder=STATES_DIR):
+        index = cls()
+        for path in sorted(glob.glob(os.path.join(folder, "*.txt"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            state = canonical_state(name)
+            if state is None:
+                print(f"Unknown state file {path}, indexing it as '{name}'")
+                state = name
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                index.add(state, list(split_paragraphs(f.read())))
+        return index
+
+    def add(self, state, chunks):
+        texts = self.chunks.setdefault(state, [])
+        bm25 = self.indexes.setdefault(state, BM25Index())
+        bm25.add(range(len(texts), len(texts) + len(chunks)), chunks)
+        texts.extend(chunks)
+
+    def search(self, state, query, k=3):
+        """Best-matching paragraphs for the farmer's state, best first."""
+        key = canonical_state(state)
+        if key not in self.indexes:
+            key = CENTRAL
+        if key not in self.indexes:
+            return []
+        return [self.chunks[key][i] for i, _ in self.indexes[key].search(query, k)]
+
+    def stats(self):
+        return {"states": len(self.chunks), "chunks": sum(len(c) for c in self.chunks.values())}
@@ -0,0 +1,330 @@
+"""
+The tabular datasets in data_csv/ loaded into an indexed SQLite store, plus
+a filter extractor that turns crop/state/season/year/district/pest
+mentions in a question into direct indexed lookups. Used instead of the
+vector search over 500-row text dumps for questions with exact figures.
+"""
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TABULAR_DB_PATH = os.getenv("TABULAR_DB_PATH", os.path.join(BASE_DIR, "tabular.db"))
+TABULAR_MAX_ROWS = int(os.getenv("TABULAR_MAX_ROWS", "15"))
+
+# table -> source file and composite indexes, most selective column first
+TABLES = {
+    "crop_yield": {
+        "file": "crop_yield.csv",
+        "indexes": [("crop", "state", "crop_year"), ("state", "crop_year"), ("crop", "season")],
+    },
+    "crop_fertilizer": {
+        "file": "Crop and fertilizer dataset.csv",
+        "indexes": [("crop", "district_name")],
+    },
+    "crop_water": {
+        "file": "crop_specific.csv",
+        "indexes": [("crop_type", "soil_type", "region")],
+    },
+    "pesticides": {
+        "file": "Pesticides.csv",
+        "indexes": [("pest_name",)],
+    },
+    "crop_temperature": {
+        "file": "crop_old_tolerance.csv",
+        "indexes": [("crop",)],
+    },
+}
+
+# Columns the extractor matches question words against
+VOCAB_COLUMNS = {
+    "crop": [("crop_yield", "crop"), ("crop_fertilizer", "crop"), ("crop_water", "crop_type"),
+             ("crop_temperature", "crop")],
+    "state": [("crop_yield", "state")],
+    "district": [("crop_fertilizer", "district_name")],
+    "pest": [("pesticides", "pest_name")],
+}
+
+CROP_ALIASES = {
+    "paddy": "rice", "dhan": "rice", "chawal": "rice", "gehun": "wheat", "gehu": "wheat",
+    "makka": "maize", "makki": "maize", "corn": "maize", "kapas": "cotton", "ganna": "sugarcane",
+    "aloo": "potato", "soybean": "soyabean", "soya": "soyabean", "chana": "gram", "chickpea": "gram",
+    "toor": "arhar", "sarson": "mustard", "rai": "mustard", "mungfali": "groundnut",
+    "peanut": "groundnut", "sorghum": "jowar", "kela": "banana",
+}
+STATE_ALIASES = {"orissa": "odisha", "pondicherry": "puducherry"}
+SEASONS = {
+    "kharif": "Kharif", "rabi": "Rabi", "zaid": "Summer", "summer": "Summer",
+    "autumn": "Autumn", "winter": "Winter", "whole year": "Whole Year",
+}
+
+YIELD_WORDS = {"yield", "yields", "production", "produce", "produced", "area", "hectare", "hectares", "tonnes",
+               "tons", "output", "statistics", "stats", "data", "rainfall", "harvest"}
+FERTILIZER_WORDS = {"fertilizer", "fertiliser", "fertilizers", "npk", "urea", "dap", "mop", "nutrient",
+                    "nutrients", "nitrogen", "phosphorus", "potassium", "manure"}
+WATER_WORDS = {"water", "irrigation", "irrigate", "watering"}
+PEST_WORDS = {"pest", "pests", "pesticide", "pesticides", "insect", "insects", "spray"}
+TEMPERATURE_WORDS = {"cold", "frost", "heat", "temperature", "hot", "threshold"}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_YEAR = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+
+
+def snake_case(name):
+    return re.sub(r"[^a-z0-9]+", "_", str(name).strip().lower()).strip("_")
+
+
+def name_key(text):
+    return " ".join(_WORD.findall(str(text).lower()))
+
+
+def singular(word):
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def value_keys(value):
+    """Lookup keys for a stored value: "Arhar/Tur" -> arhar tur, arhar, tur; "Cotton(lint)" -> cotton lint, cotton, lint."""
+    keys = {name_key(value)}
+    for part in re.split(r"[/(),&]", str(value)):
+        key = name_key(part)
+        if len(key) >= 3:
+            keys.add(key)
+    return {" ".join(singular(w) for w in k.split()) for k in keys if k}
+
+
+# ================= BUILD =================
+
+def _sql_type(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    # NOCASE so equality filters and their indexes ignore case
+    return "TEXT COLLATE NOCASE"
+
+
+def load_table(conn, table, path, batch_rows=5000):
+    """(Re)load one CSV into `table` inside the caller's transaction."""
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    created = False
+    for df in pd.read_csv(path, chunksize=batch_rows):
+        df.columns = [snake_case(c) for c in df.columns]
+        # Values like "Kharif     " carry padding in the source files
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].str.strip()
+        if not created:
+            cols = ", ".join(f'"{c}" {_sql_type(t)}' for c, t in df.dtypes.items())
+            conn.execute(f"CREATE TABLE {table} ({cols})")
+            created = True
+        placeholders = ", ".join("?" for _ in df.columns)
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+    for columns in TABLES[table]["indexes"]:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})")
+
+
+def build_tabular_db(folder_path="data_csv", db_path=TABULAR_DB_PATH, manifest=None):
+    """Load every changed table file; unchanged ones are skipped via the ingest manifest."""
+    conn = sqlite3.connect(db_path)
+    loaded = 0
+    for table, spec in TABLES.items():
+        path = os.path.join(folder_path, spec["file"])
+        if not os.path.exists(path):
+            continue
+        if manifest is not None and manifest.file_unchanged("tabular", path, path):
+            continue
+        try:
+            with conn:
+                load_table(conn, table, path)
+            if manifest is not None:
+                manifest.record_file("tabular", path, folder_path, path)
+            loaded += 1
+        except Exception as e:
+            print(f"Error loading {path} into {table}: {e}")
+    conn.execute("ANALYZE")
+    conn.close()
+    if manifest is not None:
+        manifest.commit()
+    print(f"tabular: loaded {loaded} tables into {db_path}")
+
+
+# ================= LOOKUP =================
+
+class TabularStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.tables = {
+            r[0] for r in self._conn().execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        self.vocab = self._build_vocab()
+        self.max_words = max((len(k.split()) for keys in self.vocab.values() for k in keys), default=1)
+
+    @classmethod
+    def open(cls, db_path=TABULAR_DB_PATH):
+        if not os.path.exists(db_path):
+            return None
+        try:
+            return cls(db_path)
+        except Exception as e:
+            print(f"Tabular store unavailable: {e}")
+            return None
+
+    def _conn(self):
+        # One read-only connection per worker thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def _build_vocab(self):
+        """kind -> {key: {(table, column, value)}} from the distinct values of each vocabulary column."""
+        vocab = {}
+        for kind, columns in VOCAB_COLUMNS.items():
+            keys = vocab.setdefault(kind, {})
+            for table, column in columns:
+                if table not in self.tables:
+                    continue
+                for (value,) in self._conn().execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL"):
+                    for key in value_keys(value):
+                        keys.setdefault(key, set()).add((table, column, value))
+        return vocab
+
+    def extract_filters(self, text, state=None):
+        """
+        Crop/state/district/pest values, seasons, years and question kinds
+        mentioned in `text`. `state` (from geocoding) is used when the
+        question names none.
+        """
+        words = [singular(w) for w in _WORD.findall(text.lower())]
+        words = [CROP_ALIASES.get(w, STATE_ALIASES.get(w, w)) for w in words]
+        found = {kind: set() for kind in self.vocab}
+        used = set()
+        # Longest phrases first so "west bengal" wins over "bengal"
+        for n in range(self.max_words, 0, -1):
+            for i in range(len(words) - n + 1):
+                if any(j in used for j in range(i, i + n)):
+                    continue
+                phrase = " ".join(words[i:i + n])
+                hit = False
+                for kind, keys in self.vocab.items():
+                    if phrase in keys:
+                        found[kind] |= keys[phrase]
+                        hit = True
+                if hit:
+                    used.update(range(i, i + n))
+
+        lowered = " ".join(_WORD.findall(text.lower()))
+        raw_words = set(lowered.split())
+        seasons = {value for key, value in SEASONS.items() if re.search(rf"\b{key}\b", lowered)}
+        years = sorted(int(y) for y in _YEAR.findall(text))
+        if not found["state"] and state:
+            for key in value_keys(state):
+                found["state"] |= self.vocab["state"].get(key, set())
+        return {
+            **found,
+            "season": seasons,
+            "years": (years[0], years[-1]) if years else None,
+            "asks": {
+                "yield": bool(raw_words & YIELD_WORDS) or bool(years),
+                "fertilizer": bool(raw_words & FERTILIZER_WORDS),
+                "water": bool(raw_words & WATER_WORDS),
+                "pest": bool(raw_words & PEST_WORDS) or bool(found["pest"]),
+                "temperature": bool(raw_words & TEMPERATURE_WORDS),
+            },
+        }
+
+    def _query(self, sql, params):
+        return pd.read_sql_query(sql, self._conn(), params=params)
+
+    @staticmethod
+    def _values(matches, table):
+        return sorted({value for t, _, value in matches if t == table})
+
+    @staticmethod
+    def _in(column, values):
+        return f"{column} IN ({', '.join('?' for _ in values)})", list(values)
+
+    def lookup(self, text, state=None, limit=TABULAR_MAX_ROWS):
+        """Markdown sections with the rows that answer `text`, or "" when no table applies."""
+        f = self.extract_filters(text, state)
+        asks = f["asks"]
+        sections = []
+
+        crops = self._values(f["crop"], "crop_yield")
+        states = self._values(f["state"], "crop_yield")
+        # A state alone only counts when the question is clearly about production figures
+        if "crop_yield" in self.tables and asks["yield"] and (crops or (states and f["years"])):
+            where, params = [], []
+            for column, values in (("crop", crops), ("state", states), ("season", sorted(f["season"]))):
+                if values:
+                    clause, p = self._in(column, values)
+                    where.append(clause)
+                    params += p
+            if f["years"]:
+                where.append("crop_year BETWEEN ? AND ?")
+                params += list(f["years"])
+            df = self._query(
+                "SELECT crop_year, state, season, crop, area, production, yield, annual_rainfall "
+                f"FROM crop_yield WHERE {' AND '.join(where)} ORDER BY crop_year DESC, production DESC LIMIT ?",
+                params + [limit],
+            )
+            sections.append(("Crop production (area in hectares, production in tonnes, yield in tonnes/hectare)", df))
+
+        crops = self._values(f["crop"], "crop_fertilizer")
+        if "crop_fertilizer" in self.tables and asks["fertilizer"] and crops:
+            clause, params = self._in("crop", crops)
+            districts = self._values(f["district"], "crop_fertilizer")
+            if districts:
+                d_clause, d_params = self._in("district_name", districts)
+                clause, params = f"{clause} AND {d_clause}", params + d_params
+            df = self._query(
+                "SELECT crop, district_name, soil_color, fertilizer, ROUND(AVG(nitrogen)) AS nitrogen, "
+                "ROUND(AVG(phosphorus)) AS phosphorus, ROUND(AVG(potassium)) AS potassium, "
+                "ROUND(AVG(ph), 1) AS ph, COUNT(*) AS records "
+                f"FROM crop_fertilizer WHERE {clause} GROUP BY crop, district_name, soil_color, fertilizer "
+                "ORDER BY records DESC LIMIT ?",
+                params + [limit],
+            )
+            sections.append(("Recommended fertilizer by district and soil (N, P, K in kg/ha)", df))
+
+        crops = self._values(f["crop"], "crop_water")
+        if "crop_water" in self.tables and asks["water"] and crops:
+            clause, params = self._in("crop_type", crops)
+            df = self._query(
+                "SELECT crop_type, soil_type, region, ROUND(AVG(water_requirement), 2) AS water_requirement "
+                f"FROM crop_water WHERE {clause} GROUP BY crop_type, soil_type, region LIMIT ?",
+                params + [limit],
+            )
+            sections.append(("Water requirement by soil and region", df))
+
+        pests = self._values(f["pest"], "pesticides")
+        if "pesticides" in self.tables and asks["pest"] and pests:
+            clause, params = self._in("pest_name", pests)
+            df = self._query(
+                f"SELECT pest_name, most_commonly_used_pesticides FROM pesticides WHERE {clause} LIMIT ?",
+                params + [limit],
+            )
+            sections.append(("Commonly used pesticides", df))
+
+        crops = self._values(f["crop"], "crop_temperature")
+        if "crop_temperature" in self.tables and asks["temperature"] and crops:
+            clause, params = self._in("crop", crops)
+            df = self._query(
+                f"SELECT crop, development_phase, critical_temperature_threshold FROM crop_temperature WHERE {clause} LIMIT ?",
+                params + [limit],
+            )
+            sections.append(("Critical temperatures by growth stage", df))
+
+        return "\n\n".join(f"{title}:\n{df.to_markdown(index=False)}" for title, df in sections if not df.empty)
+
@@ -0,0 +1,13 @@
+from intent_router import Plan, keyword_intents
+
+
+def test_temperature_drop_is_cold_and_weather():
+    intents = keyword_intents("Is a temperature drop expected tonight?")
+    assert intents == {"cold", "weather"}
+    assert Plan(intents, "keywords").uses("seed_db")
+
+
+def test_soil_question_fetches_soil_moisture():
+    intents = keyword_intents("How should I prepare the soil for wheat?")
+    assert "irrigation" in intents
+    assert Plan(intents, "keywords").uses("soil")
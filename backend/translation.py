@@ -0,0 +1,110 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from deep_translator import GoogleTranslator
+
+from concurrency import run_blocking
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "4096"))
+
+# Words that show up in almost any English farming question
+ENGLISH_MARKERS = {
+    "a", "an", "the", "is", "are", "was", "what", "which", "when", "where", "how", "why",
+    "should", "can", "do", "does", "my", "i", "in", "of", "for", "to", "and", "or", "with",
+    "price", "crop", "seed", "water", "rain", "weather", "soil", "irrigate", "irrigation",
+    "market", "sell", "fertilizer", "pest", "yield", "today", "tomorrow", "week", "scheme",
+}
+# Romanized Hindi/Marathi is also plain ASCII, so these rule English out
+ROMANIZED_MARKERS = {
+    "hai", "hain", "ka", "ki", "ke", "kya", "mera", "meri", "mere", "kaise", "kab", "aur",
+    "mein", "se", "ko", "nahi", "bhav", "kitna", "kitne", "kaun", "konsa", "aahe", "kay",
+    "majha", "mazha", "pani", "fasal", "kheti", "gehu", "gehun", "dhan",
+}
+
+
+def looks_english(text):
+    """Cheap local check so already-English text skips the translator."""
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return True
+    if sum(c.isascii() for c in letters) / len(letters) < 0.95:
+        return False
+    words = re.findall(r"[a-z']+", text.lower())
+    if any(word in ROMANIZED_MARKERS for word in words):
+        return False
+    return any(word in ENGLISH_MARKERS for word in words)
+
+
+class TranslationCache:
+    """LRU cache of translations keyed by (source, target, text hash)."""
+
+    def __init__(self, max_size=TRANSLATION_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source, target, text):
+        return (source, target, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped_english": self.skipped,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+translation_cache = TranslationCache()
+
+
+async def translate(text, source, target):
+    """
+    Translate off the event loop, through the cache. Falls back to the
+    original text if the translator fails.
+    """
+    if source == target or not text.strip():
+        return text
+    if target == "en" and looks_english(text):
+        translation_cache.skipped += 1
+        return text
+    key = TranslationCache.key(source, target, text)
+    cached = translation_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        translated = await run_blocking(GoogleTranslator(source=source, target=target).translate, text)
+    except Exception as e:
+        print(f"Error translating {source}->{target}: {e}")
+        return text
+    if translated:
+        translation_cache.put(key, translated)
+        return translated
+    return text
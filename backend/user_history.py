@@ -1,86 +1,87 @@
-import sqlite3
 import uuid
 from fastapi import APIRouter, Query, HTTPException, Form
 
-router = APIRouter()
+from chat_store import fetch_all, page_cursor, writer
 
-DB_PATH = "chat_history.db"
+router = APIRouter()
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# History endpoints page by keyset (the last id or created_at seen), not
+# OFFSET, so every page is one index range scan however long the history is
+MAX_PAGE = 500
 
 @router.post("/user/new_chat")
 def new_chat(user_id: str = Form(...), title: str = Form("New Chat")):
     chat_id = str(uuid.uuid4())
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
+    writer().write(
         "INSERT INTO chats (id, user_id, title) VALUES (?, ?, ?)",
         (chat_id, user_id, title)
     )
-    conn.commit()
-    conn.close()
     return {"chat_id": chat_id, "title": title}
 
 @router.get("/user/chats")
-def get_chats(user_id: str = Query(...)):
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, title, created_at FROM chats WHERE user_id = ? ORDER BY created_at DESC",
-        (user_id,)
-    )
-    chats = [{"chat_id": row["id"], "title": row["title"], "created_at": row["created_at"]} for row in cursor.fetchall()]
-    conn.close()
-    return {"chats": chats}
+def get_chats(user_id: str = Query(...), limit: int = Query(50, ge=1, le=MAX_PAGE), before: str = Query(None)):
+    """
+    Newest chats first. Pass the returned next_cursor as `before` for the
+    next page.
+    """
+    if before is None:
+        rows = fetch_all(
+            "SELECT id, title, created_at FROM chats WHERE user_id = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, limit)
+        )
+    else:
+        created_at, _, chat_id = before.rpartition("|")
+        if not created_at:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        rows = fetch_all(
+            "SELECT id, title, created_at FROM chats WHERE user_id = ? AND (created_at, id) < (?, ?) "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, created_at, chat_id, limit)
+        )
+    chats = [{"chat_id": row["id"], "title": row["title"], "created_at": row["created_at"]} for row in rows]
+    next_cursor = f"{rows[-1]['created_at']}|{rows[-1]['id']}" if len(rows) == limit else None
+    return {"chats": chats, "next_cursor": next_cursor}
 
 @router.get("/user/chat_history")
-def get_chat_history(chat_id: str = Query(...)):
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT role, content, timestamp FROM messages WHERE chat_id = ? ORDER BY id ASC",
-        (chat_id,)
+def get_chat_history(chat_id: str = Query(...), limit: int = Query(100, ge=1, le=MAX_PAGE), before: int = Query(None)):
+    """
+    The latest `limit` messages of a chat, oldest first. Pass the returned
+    next_cursor as `before` to load the messages above them.
+    """
+    rows = fetch_all(
+        "SELECT id, role, content, timestamp FROM messages WHERE chat_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+        (chat_id, before if before is not None else 2**63 - 1, limit)
     )
-    rows = cursor.fetchall()
-    conn.close()
+    next_cursor = page_cursor(rows, limit)
     history = [
-        {"role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
-        for row in rows
+        {"id": row["id"], "role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
+        for row in reversed(rows)
     ]
-    return {"history": history}
+    return {"history": history, "next_cursor": next_cursor}
 
 @router.get("/user/history")
-def get_user_history(user_id: str = Query(...), limit: int = Query(50)):
+def get_user_history(user_id: str = Query(...), limit: int = Query(50, ge=1, le=MAX_PAGE), before: int = Query(None)):
     """
-    Get chat history for a user.
+    Get chat history for a user, newest first. Pass the returned
+    next_cursor as `before` for the next page.
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT role, content, timestamp FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
-        (user_id, limit)
+    rows = fetch_all(
+        "SELECT id, role, content, timestamp FROM messages WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+        (user_id, before if before is not None else 2**63 - 1, limit)
     )
-    rows = cursor.fetchall()
-    conn.close()
     history = [
-        {"role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
+        {"id": row["id"], "role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
         for row in rows
     ]
-    return {"history": history}
+    return {"history": history, "next_cursor": page_cursor(rows, limit)}
 
 @router.delete("/user/history")
 def delete_user_history(user_id: str = Query(...)):
     """
     Delete all chat history for a user.
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
-    conn.commit()
-    conn.close()
+    writer().write("DELETE FROM messages WHERE user_id = ?", (user_id,))
     return {"success": True, "message": "Chat history deleted."}
 
 @router.post("/user/update_chat_title")
@@ -91,12 +92,8 @@ def update_chat_title(chat_id: str = Form(...), title: str = Form(...)):
     short_title = " ".join(words[:8])
     if len(short_title) > 20:
         short_title = short_title[:40].rstrip() + "..."
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute(
+    writer().write(
         "UPDATE chats SET title = ? WHERE id = ?",
         (short_title, chat_id)
     )
-    conn.commit()
-    conn.close()
     return {"success": True}
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from datetime import date
+
+from http_client import get_http_client
+
+# Weatherbit only refreshes a few times a day, so a few hours of caching is safe
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "10800"))
+WEATHER_CACHE_MAX = int(os.getenv("WEATHER_CACHE_MAX", "5000"))
+# ~11 km cells; farmers in the same cell share one upstream fetch
+WEATHER_CELL_DEG = float(os.getenv("WEATHER_CELL_DEG", "0.1"))
+# Always fetch the longest horizon any caller needs, so one fetch serves everyone
+FORECAST_DAYS = 10
+
+
+def weather_cell(lat, lon):
+    return (round(lat / WEATHER_CELL_DEG), round(lon / WEATHER_CELL_DEG))
+
+
+class CoalescingCache:
+    """
+    TTL cache for async fetches. Concurrent misses on the same key share a
+    single in-flight task instead of each calling upstream.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = {}
+        self._inflight = {}
+
+    async def get_or_fetch(self, key, fetch):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fill(key, fetch))
+            # Retrieve the exception even if every waiter timed out
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Shield so a caller's timeout doesn't cancel the fetch other callers wait on
+        return await asyncio.shield(task)
+
+    async def _fill(self, key, fetch):
+        try:
+            value = await fetch()
+            now = time.monotonic()
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                while len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (now + self.ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / total, 4) if total else 0.0,
+        }
+
+
+weather_cache = CoalescingCache(WEATHER_CACHE_TTL, WEATHER_CACHE_MAX)
+
+
+async def _get_json(url, params):
+    res = await get_http_client().get(url, params=params)
+    res.raise_for_status()
+    return res.json()
+
+
+async def fetch_daily_forecast(lat, lon):
+    """List of per-day dicts for the next FORECAST_DAYS days."""
+    async def fetch():
+        data = await _get_json(
+            "https://api.weatherbit.io/v2.0/forecast/daily",
+            {"lat": lat, "lon": lon, "days": FORECAST_DAYS, "key": os.getenv("WEATHERBIT_KEY")},
+        )
+        return [
+            {
+                "date": day.get("datetime"),
+                "temp": day.get("temp"),
+                "min_temp": day.get("min_temp"),
+                "max_temp": day.get("max_temp"),
+                "precip": day.get("precip"),
+                "rh": day.get("rh"),
+                "wind": day.get("wind_spd"),
+                "description": (day.get("weather") or {}).get("description", ""),
+            }
+            for day in data.get("data", [])
+        ]
+
+    key = ("daily", weather_cell(lat, lon), date.today().isoformat())
+    return await weather_cache.get_or_fetch(key, fetch)
+
+
+async def fetch_agweather(lat, lon):
+    """Latest agweather day (soil moisture, 2m temperature, precipitation) or None."""
+    async def fetch():
+        data = await _get_json(
+            "https://api.weatherbit.io/v2.0/forecast/agweather",
+            {"lat": lat, "lon": lon, "key": os.getenv("WEATHERBIT_KEY")},
+        )
+        days = data.get("data") or []
+        return days[0] if days else None
+
+    key = ("agweather", weather_cell(lat, lon), date.today().isoformat())
+    return await weather_cache.get_or_fetch(key, fetch)
+
+
+def needs_irrigation(day):
+    precip, rh = day.get("precip"), day.get("rh")
+    return precip is not None and precip < 5 and rh is not None and rh < 60
+
+
+def format_forecast(days):
+    lines = [
+        f"{day['date']}: Temp={day['temp']}°C, Precip={day['precip']}mm, RH={day['rh']}%, "
+        f"Wind={day['wind']}m/s, Weather='{day['description']}', "
+        f"Irrigation Needed={'Yes' if needs_irrigation(day) else 'No'}"
+        for day in days
+    ]
+    return "\n".join(lines)
+
+
+def format_soil_moisture(latest):
+    if not latest:
+        return ""
+    return (
+        f"Latest Soil Moisture (mm): 0-10cm: {latest.get('soilm_0_10cm', 'N/A')}, "
+        f"10-40cm: {latest.get('soilm_10_40cm', 'N/A')}, 40-100cm: {latest.get('soilm_40_100cm', 'N/A')}, "
+        f"100-200cm: {latest.get('soilm_100_200cm', 'N/A')} | "
+        f"Temp: {latest.get('temp_2m_avg', 'N/A')}°C | Precip: {latest.get('precip', 'N/A')}mm"
+    )
+
+
+def min_forecast_temp(days):
+    """Lowest daily minimum over `days`; the daily average would understate frost risk."""
+    temps = [day["min_temp"] for day in days if day.get("min_temp") is not None]
+    return min(temps) if temps else None
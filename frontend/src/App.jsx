@@ -61,6 +61,18 @@ function getUserFromToken() {
   }
 }
 
+// /user/chats returns one page at a time; follow next_cursor so the sidebar lists every chat
+async function fetchAllChats(backendUrl, userId) {
+  const chats = [];
+  let before;
+  do {
+    const res = await axios.get(`${backendUrl}/user/chats`, { params: { user_id: userId, limit: 100, before } });
+    chats.push(...(res.data.chats || []));
+    before = res.data.next_cursor;
+  } while (before);
+  return chats;
+}
+
 function MainApp() {
 
   
@@ -215,8 +227,7 @@ const determineZoomLevel = (locationType) => {
   // Refresh chats
   const refreshChats = async () => {
     if (user && user.user_id) {
-      const res = await axios.get(`${backendUrl}/user/chats`, { params: { user_id: user.user_id } });
-      setChats(res.data.chats);
+      setChats(await fetchAllChats(backendUrl, user.user_id));
       // Remove setActiveChatId here!
     }
   };
@@ -596,11 +607,11 @@ const determineZoomLevel = (locationType) => {
   useEffect(() => {
     const selectOrCreateChat = async () => {
       if (user && user.user_id) {
-        const res = await axios.get(`${backendUrl}/user/chats`, { params: { user_id: user.user_id } });
-        setChats(res.data.chats);
+        const chats = await fetchAllChats(backendUrl, user.user_id);
+        setChats(chats);
 
-        if (res.data.chats && res.data.chats.length > 0) {
-          setActiveChatId(res.data.chats[0].chat_id);
+        if (chats.length > 0) {
+          setActiveChatId(chats[0].chat_id);
         } else {
           const formData = new FormData();
           formData.append("user_id", user.user_id);
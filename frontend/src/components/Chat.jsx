@@ -75,6 +75,16 @@ const chatStyles = `
   0%, 80%, 100% { opacity: 0.2; }
   40% { opacity: 1; }
 }
+.load-older-btn {
+  display: block;
+  margin: 0 auto 12px;
+  background: #f0f0f0;
+  border: none;
+  border-radius: 6px;
+  cursor: pointer;
+  padding: 4px 12px;
+  font-size: 0.9rem;
+}
 .chat-input {
   display: flex;
   gap: 8px;
@@ -110,6 +120,8 @@ if (typeof window !== "undefined" && !document.getElementById("chat-css")) {
 }
 
 const API_URL = "http://127.0.0.1:8000";
+// Messages per /user/chat_history page; older ones load on demand
+const HISTORY_PAGE = 100;
 const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
 
 const ChatBox = forwardRef(({ activeChatId, user, refreshChats, location, lang }, ref) => {
@@ -117,26 +129,79 @@ const ChatBox = forwardRef(({ activeChatId, user, refreshChats, location, lang }
   const [messages, setMessages] = useState([]);
   const [listening, setListening] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
+  // Cursor for the page of messages above the oldest one shown, null when there are none
+  const [olderCursor, setOlderCursor] = useState(null);
   const chatWindowRef = useRef(null);
+  // Scroll height before older messages were prepended, to keep the view in place
+  const prependHeight = useRef(null);
 
-  // Scroll to bottom when messages change
+  // Scroll to bottom when messages change, except when older ones were added on top
   useEffect(() => {
-    if (chatWindowRef.current) {
-      chatWindowRef.current.scrollTop = chatWindowRef.current.scrollHeight;
+    const win = chatWindowRef.current;
+    if (!win) return;
+    if (prependHeight.current !== null) {
+      win.scrollTop = win.scrollHeight - prependHeight.current;
+      prependHeight.current = null;
+    } else {
+      win.scrollTop = win.scrollHeight;
     }
   }, [messages, isLoading]);
 
-  // Fetch chat history when activeChatId changes
+  // Fetch the latest page of chat history when activeChatId changes
   useEffect(() => {
+    setOlderCursor(null);
     if (activeChatId) {
       axios
-        .get(`${API_URL}/user/chat_history`, { params: { chat_id: activeChatId } })
-        .then((res) => setMessages(res.data.history || []));
+        .get(`${API_URL}/user/chat_history`, { params: { chat_id: activeChatId, limit: HISTORY_PAGE } })
+        .then((res) => {
+          setMessages(res.data.history || []);
+          setOlderCursor(res.data.next_cursor ?? null);
+        });
     } else {
       setMessages([]);
     }
   }, [activeChatId]);
 
+  const loadOlder = async () => {
+    const res = await axios.get(`${API_URL}/user/chat_history`, {
+      params: { chat_id: activeChatId, limit: HISTORY_PAGE, before: olderCursor },
+    });
+    prependHeight.current = chatWindowRef.current ? chatWindowRef.current.scrollHeight : null;
+    setMessages((prev) => [...(res.data.history || []), ...prev]);
+    setOlderCursor(res.data.next_cursor ?? null);
+  };
+
+  // Stream the answer from /ask/stream, growing the AI message as tokens arrive
+  const streamAnswer = async (formData) => {
+    const res = await fetch(`${API_URL}/ask/stream`, { method: "POST", body: formData });
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let answer = null;
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split("\n\n");
+      buffer = events.pop();
+      for (const raw of events) {
+        const event = raw.match(/^event: (.*)$/m)?.[1];
+        const data = raw.match(/^data: (.*)$/m)?.[1];
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === "error") throw new Error(payload.detail);
+        if (event !== "token" && event !== "done") continue;
+        const first = answer === null;
+        answer = event === "done" ? payload.response : (answer || "") + payload.text;
+        if (first) setIsLoading(false);
+        setMessages((prev) =>
+          first ? [...prev, { role: "ai", content: answer }] : [...prev.slice(0, -1), { role: "ai", content: answer }]
+        );
+      }
+    }
+  };
+
   const handleSend = async (customInput) => {
     if (!activeChatId) return; // Prevent sending if no chat id
     const msg = customInput !== undefined ? customInput : input;
@@ -154,10 +219,7 @@ const ChatBox = forwardRef(({ activeChatId, user, refreshChats, location, lang }
     formData.append("lang", lang);
 
     try {
-      const res = await axios.post(`${API_URL}/ask`, formData);
-      if (res.data.response) {
-        setMessages((prev) => [...prev, { role: "ai", content: res.data.response }]);
-      }
+      await streamAnswer(formData);
       // If this is the first user message, update chat title
       if (messages.length === 0) {
         const titleForm = new FormData();
@@ -269,6 +331,12 @@ const ChatBox = forwardRef(({ activeChatId, user, refreshChats, location, lang }
 
   return (
     <div className="chat-window" ref={chatWindowRef}>
+      {olderCursor !== null && (
+        <button className="load-older-btn" onClick={loadOlder}>
+          Load earlier messages
+        </button>
+      )}
+
       {messages.map((msg, idx) => (
         <div key={idx} className={`message ${msg.role}`}>
           <img